@@ -30,8 +30,53 @@ nextmonth:  takes the next month from calendar, and goes through every day
             ("every year" mode)
 nextmonth5: as nextmonth, but searches for round anniversaries
             (elapsed time should be divisible by 5)
+nextyear:   goes through every day of the next year ("every year" mode)
+nextyear5:  as nextyear, but searches for round anniversaries
 In lack of parameters the bot will work with data wired in main().
 -noskip:    forces the bot to reprocess existing target pages (see above).
+-dump:      reads the articles from a local pages-articles XML dump (may be
+            compressed with bz2) instead of the API. All the days of the
+            run are processed in one pass over the dump, e.g.
+            -dump:huwiki-latest-pages-articles.xml.bz2
+            The days of an article are taken from the links written in its
+            text, so links coming from templates are missed. With -store,
+            the results are recorded as of the time of the dump, so
+            incremental takes the changes since the dump.
+-workers:   number of processes crawling the days of the run in parallel,
+            e.g. -workers:4 (default: 1). The pages are saved by the main
+            process at the end. Not used with -dump.
+-cache:     file name of an SQLite database keeping the cleaned texts of the
+            pages between runs, e.g. -cache:anniversary.sqlite. Pages not
+            changed since the previous run are not downloaded again, only
+            their revision IDs.
+-cachesize: maximum size of the cache in megabytes (default: 200). The
+            least recently used pages are dropped beyond that.
+-store:     file name of an SQLite database recording the results of the
+            days processed and the time of the run, e.g.
+            -store:anniversary-hits.sqlite. Required by incremental and render.
+incremental: updates the days recorded in the store by the pages changed
+            since the previous run (taken from the recent changes), instead
+            of processing them again. Only the result pages of the days
+            these pages had or have results for are rebuilt. The days of a
+            changed article are taken from its links as the wiki knows them
+            (also those from templates), as in a full run. The wiki only
+            keeps the recent changes for a while (30 days on Wikimedia
+            wikis); if the previous run is older than that, it stops with
+            an error, and a full run is needed.
+render:     builds the result pages of all the days in the store again from
+            the results stored there, without fetching any articles. Use
+            it after changing the look of the pages (e.g. snippetwidth).
+-changes:   with incremental, a JSON file of recent changes to use instead
+            of asking the wiki (a list of items like those of the API, with
+            at least 'title' and 'timestamp'), mainly for testing
+-stats:     measures the time spent on fetching, cleanup, parse3(), templates,
+            date matching and building the result pages, counts the pages
+            processed and skipped and the results, and writes them per day
+            and for the whole run as JSON into a file with the slowest
+            pages, e.g. -stats:anniversary-stats.json. When several days
+            are processed together, the work shared by them (fetching,
+            cleanup, templates and date matching) is only in the numbers of
+            the whole run.
  
 HELP FOR LOCALIZATION
 This script is developed for Hungarian Wikipedia.
@@ -40,9 +85,10 @@ global stopsections
 global infobox (if there is no such word, your task may be hard, eat chocolate)
 global basepage -- where to save
 global header
-dailybot.yearregex, dateregex, dateregexwithyear (__init__)
+session.yearregex()
+dateregexes() and datematcher (__init__), they must find the same dates
 dailybot.categories()
-dailybot.createpage()
+dailybot.daytitle() and dailybot.render()
 This requires a basic knowledge of regular expressions.
 Remove the line "from binbotutils import levelez" below and any lines
 containing "levelez", "hiba" or "fatal" (these serve my own needs).
@@ -52,9 +98,14 @@ See also [[hu:User:BinBot/anniversary.py/doc]].
  
 Structure:
   dailybot processes one given day (with given year endings, if applicable).
+  session holds what the dailybots of a run share (site, caches, regexes).
   callbot validates the parameters for one day and calls dailybot.
   Any further frame may be written to call callbot in loop.
   There are some at the end for sample.
+  dumpscanner reads a dump once and feeds several dailybots at the same time.
+  backlinkscanner does the same with the articles linking to their days.
+  incrementalupdater feeds them with the recently changed pages only, and
+  hitstore keeps their results between runs.
 """
 '''
 TODO
@@ -64,9 +115,11 @@ TODO
     Completely new functionalities to read and write Wikidata?
 '''
 
-import re, datetime, locale
+import re, datetime, locale, multiprocessing, bisect, os, sqlite3, time, json
+import contextlib, heapq, queue, threading
 import pywikibot
-from pywikibot import pagegenerators, date
+from pywikibot import pagegenerators, date, xmlreader
+from pywikibot.comms import http
 from pywikibot.bot import SingleSiteBot
 locale.setlocale(locale.LC_ALL, '')
 
@@ -108,18 +161,783 @@ Itt van egy leírás, hogyan készült: [[Szerkesztő:BinBot/anniversary.py/doc]
 Utolsó módosítás: ~~~~~
 
 '''
+# Number of characters shown on both sides of a date found in the text
+# (at most contextwidth, which is kept in the HitStore for later rendering):
+snippetwidth = 60
 # --*-- End of global stuff to be localized. Go to dailybot to continue. --*--
+contextwidth = 200
 # Section titles (second level is enough for us):
 sectionpattern = re.compile(r'^==[^=].*?==')
 references =  re.compile(r'(?ism)<ref[ >].*?</ref>')
 HTMLcomments = re.compile(r'(?s)<!--.*?-->')
-TEMP_REGEX = re.compile(
-    '(?sm){{(?:msg:)?(?P<name>[^{\|]+?)(?:\|(?P<params>[^{]+?(?:{[^{]+?}[^{]*?)?))?}}')
-# The above 3 regexes are copied from textlib.py. TEMP_REGEX is far not perfect
-# for nested templates but currently the best known effort.
+# The above 2 regexes are copied from textlib.py.
+# Tokens of templates for splittemplates():
+templatetokens = re.compile(r'\{\{+|\}\}+|\[\[|\]\]|[|=]')
+# Parts of the text where wiki markup is disabled, the same as in
+# textlib.isDisabled(). The tag pattern is copied from textlib.py, too.
+disabledparts = [HTMLcomments] + [
+    re.compile(r'(?i)<{0}(?:>|\s+[^>]*(?<!/)>)[\s\S]*?</{0}\s*>'.format(tag))
+    for tag in ['includeonly', 'nowiki', 'pre', 'syntaxhighlight', 'source']]
+# Wikilinks; the target is used to find the day pages in dumps:
+linkregex = re.compile(r'\[\[\s*:?\s*([^\[\]\|#\n]+)')
+
+def disabledspans(text):
+    """
+    Return the parts of the text where wiki markup is disabled.
+    
+    The result is a sorted list of [start, end] pairs, and text[where] is
+    disabled if and only if start < where < end for one of them. This is what
+    pywikibot.isDisabled() tells, but the text is searched only once instead
+    of once per question. The parts are removed one kind after the other as
+    in textlib.removeDisabledParts(), so that overlapping tags give the same
+    result.
+    """
+    spans = []
+    for regex in disabledparts:
+        # The parts of the original text that have not been removed yet:
+        kept = []
+        where = 0
+        for (start, end) in spans:
+            if start > where:
+                kept.append((where, start))
+            where = end
+        if where < len(text):
+            kept.append((where, len(text)))
+        rest = ''.join(text[start:end] for (start, end) in kept)
+        # Offsets of the kept parts in rest
+        offsets = []
+        length = 0
+        for (start, end) in kept:
+            offsets.append(length)
+            length += end - start
+        def original(i):
+            k = bisect.bisect_right(offsets, i) - 1
+            return kept[k][0] + i - offsets[k]
+        found = [[original(m.start()), original(m.end() - 1) + 1]
+                 for m in regex.finditer(rest)]
+        # New parts may contain old ones but never cross them.
+        merged = []
+        k = 0
+        for span in spans:
+            while k < len(found) and found[k][1] <= span[0]:
+                merged.append(found[k])
+                k += 1
+            if k == len(found) or found[k][0] > span[0]:
+                merged.append(span)
+        spans = merged + found[k:]
+    return spans
+
+def dateregexes(lang, month, day, yearmodulo5=None):
+    """Return the regexes of a day without and with year as a tuple."""
+    # Create a regex which shows how the dates are written in your wiki.
+    # Think of various linking possibilities!
+    # This one does not contain year; may be used in the articles of years.
+    if day < 10:
+        r = r'0?%d' % day
+    else:
+        r = r'%d' % day
+    m = date.monthName(lang, month)
+    # ?P<year> identifies the year part (this is the sortkey for results)
+    # ?P<date> identifies the date part w/o year (currently not used AFAIK)
+    dateregex = re.compile(
+        r'(?i)(\[{2})?(?P<date>%s *%s\.?)(\|.*?)?(\]{2})?(?!\d)' % (m, r))
+    # And this one with years (I don't treat 0 separately here)
+    if yearmodulo5 is None:
+        y = r'\d+'
+    else:
+        y = r'\d*[%d%d]' % (yearmodulo5, yearmodulo5 + 5)
+    dateregexwithyear = re.compile(
+        r'(?i)(\[{2})?(?P<year>%s)(\]{2})?\.? *(\[{2})?(?P<date>%s *%s\.?)(\|.*?)?(\]{2})?(?!\d)' \
+        % (y, m, r))
+    return (dateregex, dateregexwithyear)
+
+class DateMatcher(object):
+    """Find the dates of many days with one scan of a text.
+    
+    The same dates are found as with the regexes of dateregexes(), but the
+    months and days are all in one regex, and each match tells its month and
+    day. So a text has to be searched only once for a month or a whole year
+    instead of once per day. If you localize dateregexes(), localize this too.
+    """
+    
+    def __init__(self, lang, days=None):
+        """Constructor.
+        
+        Parameters:
+        lang: language code of the month names
+        days: list of (month, day) tuples to find; every day if None
+        """
+        if days is None:
+            days = [(month, day)
+                    for month in range(1, 13) for day in range(1, 32)]
+        self.days = set(days)
+        self.monthnumbers = dict(
+            (date.monthName(lang, month).lower(), month)
+            for month in set(month for (month, day) in self.days))
+        m = '|'.join(re.escape(name)
+                     for name in sorted(self.monthnumbers, key=len, reverse=True))
+        # The day is taken with any number, the wrong ones are dropped later.
+        r = r'(?P<month>%s) *(?P<day>\d{1,2})' % m
+        self.dateregex = re.compile(
+            r'(?i)(\[{2})?(?P<date>%s\.?)(\|.*?)?(\]{2})?(?!\d)' % r)
+        self.dateregexwithyear = re.compile(
+            r'(?i)(\[{2})?(?P<year>\d+)(\]{2})?\.? *(\[{2})?(?P<date>%s\.?)(\|.*?)?(\]{2})?(?!\d)' % r)
+    
+    def day(self, m):
+        """Return the (month, day) of a match, or None if not searched."""
+        day = (self.monthnumbers[m.group('month').lower()], int(m.group('day')))
+        if day in self.days:
+            return day
+        return None
+    
+    def finditer(self, text):
+        """Yield (month, day, year, span) for each date with year."""
+        for m in self.dateregexwithyear.finditer(text):
+            day = self.day(m)
+            if day:
+                yield (day[0], day[1], int(m.group('year')), m.span())
+    
+    def dates(self, text):
+        """Return the set of (month, day) of the dates without year."""
+        days = set()
+        for m in self.dateregex.finditer(text):
+            day = self.day(m)
+            if day:
+                days.add(day)
+        return days
+
+def splittemplates(text):
+    """
+    Find the templates of the text and remove them in one pass.
+    
+    Returns a tuple of
+    - a list of (name, params) tuples for every template including the nested
+      ones, in the order of their beginning (like the result of
+      textlib.extract_templates_and_params()); params is a dictionary of
+      parameter names and values, unnamed parameters are numbered from 1
+    - the text without templates.
+    Braces are matched with a stack, so any depth of nesting is handled in a
+    single pass. As by MediaWiki (and templatespans() of params_all.py),
+    {{{ opens a template parameter to be closed by }}}, and e.g. {{{{{ is {{
+    followed by {{{. Parameters are not templates, and they are left in the
+    text unless they are inside a template. Unclosed {{ are left in the text.
+    """
+    found = [] # (start, end, name, params) of closed templates
+    # Open templates and parameters:
+    # [start, linkdepth, [(pipe, equals), ...], number of braces]
+    stack = []
+    for m in templatetokens.finditer(text):
+        token = m.group()
+        if token[0] == '{':
+            start = m.start()
+            n = len(token)
+            while n >= 2:
+                size = 3 if n == 3 else 2
+                stack.append([start, 0, [], size])
+                start += size
+                n -= size
+            continue
+        elif not stack:
+            continue
+        elif token[0] == '}':
+            end = m.start()
+            n = len(token)
+            while n >= 2 and stack:
+                (start, linkdepth, parts, size) = stack.pop()
+                closed = 3 if size == 3 and n >= 3 else 2
+                end += closed
+                n -= closed
+                if size == 3:
+                    continue # A parameter
+                # Pipes and equal signs of the template itself
+                pipes = [pipe for (pipe, equals) in parts] + [end - 2]
+                name = text[start + 2:pipes[0]].strip()
+                params = dict()
+                unnamed = 0
+                for (i, (pipe, equals)) in enumerate(parts):
+                    if equals is None:
+                        unnamed += 1
+                        params[str(unnamed)] = text[pipe + 1:pipes[i + 1]]
+                    else:
+                        params[text[pipe + 1:equals]] = \
+                            text[equals + 1:pipes[i + 1]]
+                found.append((start, end, name, params))
+        elif token == '[[':
+            stack[-1][1] += 1
+        elif token == ']]':
+            if stack[-1][1]:
+                stack[-1][1] -= 1
+        elif stack[-1][1]:
+            pass # A pipe or equal sign of a link
+        elif token == '|':
+            stack[-1][2].append((m.start(), None))
+        elif stack[-1][2] and stack[-1][2][-1][1] is None:
+            # The first equal sign of a parameter separates the name
+            stack[-1][2][-1] = (stack[-1][2][-1][0], m.start())
+    found.sort()
+    templates = [(name, params) for (start, end, name, params) in found]
+    # Only the outermost templates have to be cut out.
+    pieces = []
+    where = 0
+    for (start, end, name, params) in found:
+        if start >= where:
+            pieces.append(text[where:start])
+            where = end
+    pieces.append(text[where:])
+    return (templates, ''.join(pieces))
+
+class TextCache(object):
+    """Cleaned texts of pages kept on disk between runs.
+    
+    The result of DailyBot.cleanup() is stored with the title and the
+    revision ID of the page, and it is valid only as long as the page has
+    that revision. The total size is kept under a limit by dropping the least
+    recently used pages. Each process opens its own connection, so the cache
+    may be shared by the workers of run_days(). Within a process the
+    connection is shared by the threads (see prefetch()), one at a time.
+    Every change is committed at once, so no process keeps the others
+    waiting for the database while it is waiting for the wiki. The cache
+    only saves time: if the database cannot be used, the pages are fetched
+    as if they were not in it.
+    """
+    
+    def __init__(self, filename, maxsize=200):
+        """Constructor.
+        
+        Parameters:
+        filename: the SQLite database file (created if needed)
+        maxsize: maximum size of the stored texts in megabytes
+        """
+        self.filename = filename
+        self.maxsize = maxsize * 2 ** 20
+        self.db = None
+        self.pid = None
+        self.changes = 0
+        self.warned = False
+        self.lock = threading.RLock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['db'] = None
+        del state['lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+    
+    def connect(self):
+        """Return the connection of this process."""
+        if self.db is None or self.pid != os.getpid():
+            db = sqlite3.connect(self.filename, timeout=60,
+                                 check_same_thread=False)
+            # Readers do not block the writer of another process.
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = NORMAL')
+            # Must precede the creation of the table to take effect.
+            db.execute('PRAGMA auto_vacuum = FULL')
+            db.execute('CREATE TABLE IF NOT EXISTS texts ('
+                       'title TEXT PRIMARY KEY, revid INTEGER, '
+                       'intro TEXT, body TEXT, size INTEGER, used REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS texts_used ON texts (used)')
+            db.commit()
+            # Only set when ready, so a failed setup is tried again.
+            (self.db, self.pid) = (db, os.getpid())
+        return self.db
+    
+    def get(self, title, revid):
+        """Return the cleaned text tuple of the revision or None."""
+        with self.lock:
+            try:
+                db = self.connect()
+                row = db.execute('SELECT intro, body FROM texts '
+                                 'WHERE title = ? AND revid = ?',
+                                 (title, revid)).fetchone()
+                if row is None:
+                    return None
+                db.execute('UPDATE texts SET used = ? WHERE title = ?',
+                           (time.time(), title))
+                self.commit()
+            except sqlite3.OperationalError as e:
+                self.failed(e)
+                return None
+        return tuple(row)
+    
+    def put(self, title, revid, texttuple):
+        """Store the cleaned text tuple of a revision."""
+        size = len(texttuple[0].encode('utf-8')) + \
+            len(texttuple[1].encode('utf-8'))
+        with self.lock:
+            try:
+                db = self.connect()
+                db.execute(
+                    'INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?, ?, ?)',
+                    (title, revid, texttuple[0], texttuple[1], size,
+                     time.time()))
+                self.commit()
+            except sqlite3.OperationalError as e:
+                self.failed(e)
+    
+    def commit(self, force=False):
+        """Commit the changes, and make room every now and then if needed."""
+        with self.lock:
+            try:
+                db = self.connect()
+                self.changes += 1
+                if force or self.changes >= 100:
+                    self.changes = 0
+                    self.makeroom(db)
+                db.commit()
+            except sqlite3.OperationalError as e:
+                self.failed(e)
+    
+    def makeroom(self, db):
+        """Drop the least recently used pages if the cache is too big."""
+        (total,) = db.execute('SELECT TOTAL(size) FROM texts').fetchone()
+        if total <= self.maxsize:
+            return
+        # Leave some room.
+        dropped = []
+        for (title, size) in db.execute(
+                'SELECT title, size FROM texts ORDER BY used'):
+            if total <= self.maxsize * 0.9:
+                break
+            dropped.append((title,))
+            total -= size
+        db.executemany('DELETE FROM texts WHERE title = ?', dropped)
+    
+    def failed(self, error):
+        """Give up the change in progress after a database error."""
+        if self.db is not None and self.pid == os.getpid():
+            try:
+                self.db.rollback()
+            except sqlite3.Error:
+                pass
+        if not self.warned:
+            self.warned = True
+            pywikibot.warning('The text cache %s cannot be used (%s); the '
+                              'pages are fetched instead.'
+                              % (self.filename, error))
+    
+    def close(self):
+        with self.lock:
+            if self.db is not None and self.pid == os.getpid():
+                self.commit(True)
+                self.db.close()
+                self.db = None
+
+class HitStore(object):
+    """Results of the days kept on disk, for incremental updates.
+    
+    Every hit is stored with the title and revision ID of the page it comes
+    from, so the hits of a changed page can be replaced without processing
+    the day again. The days (targets) are stored with the time their results
+    are valid for. As the hits are stored before formatting (see
+    DailyBot.show()), the result pages can also be rendered again from here
+    without fetching anything.
+    """
+    
+    def __init__(self, filename):
+        """Constructor.
+        
+        Parameters:
+        filename: the SQLite database file (created if needed)
+        """
+        self.filename = filename
+        self.db = sqlite3.connect(filename, timeout=60)
+        self.db.execute('CREATE TABLE IF NOT EXISTS targets ('
+                        'month INTEGER, day INTEGER, year5 INTEGER, '
+                        'timestamp TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS hits ('
+                        'title TEXT, month INTEGER, day INTEGER, '
+                        'year5 INTEGER, section TEXT, revid INTEGER, '
+                        'year INTEGER, text TEXT, start INTEGER, end INTEGER)')
+        self.db.execute(
+            'CREATE INDEX IF NOT EXISTS hits_title ON hits (title)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS hits_target '
+                        'ON hits (month, day, year5)')
+        self.db.commit()
+    
+    def insert(self, bot):
+        """Add the results of the bot."""
+        self.db.executemany(
+            'INSERT INTO hits (month, day, year5, section, title, revid, '
+            'year, text, start, end) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((bot.month, bot.day, bot.year5, sect) + item
+             for (sect, items) in bot.export().items() for item in items))
+    
+    def record(self, bot, timestamp):
+        """Replace the results of the bot's day with the current ones.
+        
+        timestamp is the time the results are valid for: the time the
+        processing started, or that of the dump they come from.
+        """
+        target = (bot.month, bot.day, bot.year5)
+        # year5 may be None, hence IS instead of =
+        self.db.execute('DELETE FROM hits WHERE month = ? AND day = ? '
+                        'AND year5 IS ?', target)
+        self.db.execute('DELETE FROM targets WHERE month = ? AND day = ? '
+                        'AND year5 IS ?', target)
+        self.insert(bot)
+        self.db.execute('INSERT INTO targets VALUES (?, ?, ?, ?)',
+                        target + (timestamp.isoformat(),))
+        self.db.commit()
+    
+    def targets(self):
+        """Return the recorded days as (month, day, yearmodulo5) tuples."""
+        return [tuple(row) for row in self.db.execute(
+            'SELECT month, day, year5 FROM targets ORDER BY month, day')]
+    
+    def since(self):
+        """Return the time the oldest results are valid for."""
+        (timestamp,) = self.db.execute(
+            'SELECT MIN(timestamp) FROM targets').fetchone()
+        return pywikibot.Timestamp.fromISOformat(timestamp)
+    
+    def targetsof(self, titles):
+        """Return the days having results from the pages."""
+        targets = set()
+        for title in titles:
+            targets.update(tuple(row) for row in self.db.execute(
+                'SELECT DISTINCT month, day, year5 FROM hits WHERE title = ?',
+                (title,)))
+        return targets
+    
+    def replace(self, titles, bots, timestamp):
+        """Replace the results from the pages with those of the bots.
+        
+        The bots must have processed exactly these pages, and they must
+        cover all the recorded days. timestamp is the time the processing
+        started.
+        """
+        self.db.executemany('DELETE FROM hits WHERE title = ?',
+                            ((title,) for title in titles))
+        for bot in bots:
+            self.insert(bot)
+        self.db.execute('UPDATE targets SET timestamp = ?',
+                        (timestamp.isoformat(),))
+        self.db.commit()
+    
+    def data(self, month, day, yearmodulo5):
+        """Return the results of a day in the form of DailyBot.export()."""
+        data = dict()
+        for row in self.db.execute(
+                'SELECT section, title, revid, year, text, start, end '
+                'FROM hits WHERE month = ? AND day = ? AND year5 IS ?',
+                (month, day, yearmodulo5)):
+            data.setdefault(row[0], []).append(tuple(row[1:]))
+        return data
+    
+    def close(self):
+        self.db.close()
+
+class Stats(object):
+    """Wall times and counters of the stages of processing.
+    
+    Nothing is measured unless enabled, so the methods may be called
+    anyway. Each DailyBot has its own, and so does a MultiDayProcessor for
+    the work shared by its days; run_days() adds them up.
+    """
+    
+    def __init__(self, enabled=False, slowest=10):
+        """Constructor.
+        
+        Parameters:
+        enabled: whether to measure anything
+        slowest: number of the slowest pages to keep
+        """
+        self.enabled = enabled
+        self.slowest = slowest
+        self.seconds = dict() # stage => wall time
+        self.calls = dict() # stage => number of calls
+        self.counts = dict() # event => number of occurrences
+        self.pages = [] # heap of (seconds, title) of the slowest pages
+    
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Measure the time spent in a with block."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0) + \
+                time.perf_counter() - start
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+    
+    def iterate(self, stage, iterable):
+        """Yield from iterable, measuring the time spent waiting for it."""
+        iterator = iter(iterable)
+        while True:
+            with self.timer(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    
+    def count(self, event, n=1):
+        """Count an event."""
+        if self.enabled:
+            self.counts[event] = self.counts.get(event, 0) + n
+    
+    def page(self, title, seconds):
+        """Record the time spent on a page, keeping the slowest ones."""
+        if not self.enabled:
+            return
+        if len(self.pages) < self.slowest:
+            heapq.heappush(self.pages, (seconds, title))
+        else:
+            heapq.heappushpop(self.pages, (seconds, title))
+    
+    def add(self, other):
+        """Add the measurements of another Stats."""
+        for (mine, theirs) in [(self.seconds, other.seconds),
+                               (self.calls, other.calls),
+                               (self.counts, other.counts)]:
+            for (key, value) in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+        for item in other.pages:
+            self.page(item[1], item[0])
+    
+    def summary(self):
+        """Return the measurements in a JSON serializable form."""
+        return {
+            'seconds': dict((stage, round(seconds, 3))
+                            for (stage, seconds) in self.seconds.items()),
+            'calls': self.calls,
+            'counts': self.counts,
+            'slowest': [[title, round(seconds, 3)] for (seconds, title)
+                        in sorted(self.pages, reverse=True)],
+        }
+
+def prefetch(generator, size=100):
+    """Yield the items of a generator, produced in a background thread.
+    
+    The thread runs ahead of the consumer by at most size items, so the
+    next batches of a preloading generator are being downloaded while the
+    previous ones are processed. Exceptions of the generator are raised
+    here.
+    """
+    items = queue.Queue(size)
+    stop = threading.Event()
+    end = object()
+    
+    def produce():
+        try:
+            for item in generator:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            items.put((end, None))
+        except BaseException as e:
+            items.put((end, e))
+    
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            (item, error) = items.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        # Let the producer finish if the consumer has given up.
+        stop.set()
+
+def existingtitles(site, titles):
+    """Return the set of the titles of existing pages.
+    
+    The pages are checked in batches instead of one by one.
+    """
+    pages = [pywikibot.Page(site, title) for title in titles]
+    return set(page.title() for page in site.preloadpages(pages, content=False)
+               if page.exists())
+
+def unskipped(bots):
+    """Return the bots whose result page must be built (see DailyBot.skip()).
+    
+    The existence of the result pages is checked in one go.
+    """
+    titles = [bot.createpage(checkonly=True)
+              for bot in bots if not bot.overwrite]
+    existing = existingtitles(pywikibot.Site(), titles) if titles else set()
+    return [bot for bot in bots if not bot.skip(existing)]
+
+class SaveQueue(object):
+    """Result pages waiting to be saved.
+    
+    Saving is deferred until flush(), so the crawl does not have to wait
+    for the edit throttle. Saves failed for a transient reason (edit
+    conflict, server error or timeout) are retried, other failures (e.g.
+    spam or abuse filter, protection) are not. A summary is written at the
+    end.
+    """
+    
+    def __init__(self, retries=3, wait=60):
+        """Constructor.
+        
+        Parameters:
+        retries: number of further attempts after a failed save
+        wait: seconds to wait before the first retry, doubled each time
+        """
+        self.retries = retries
+        self.wait = wait
+        self.queue = [] # (page, text, summary)
+    
+    def add(self, page, text, summary):
+        """Put a page into the queue."""
+        self.queue.append((page, text, summary))
+    
+    def save(self, page, text, summary):
+        """Save a page; return True if succeeded."""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                wait = self.wait * 2 ** (attempt - 1)
+                pywikibot.output('Retrying %s in %d seconds...'
+                                 % (page.title(asLink=True), wait))
+                time.sleep(wait)
+            try:
+                page.put(text, summary)
+                return True
+            except (pywikibot.EditConflict, pywikibot.ServerError,
+                    pywikibot.exceptions.TimeoutError) as e:
+                pywikibot.error('%s not saved: %s' % (page.title(), e))
+            except pywikibot.Error as e:
+                pywikibot.error('%s not saved: %s' % (page.title(), e))
+                return False # No use trying again
+        return False
+    
+    def flush(self):
+        """Save the pages in the queue and report the result."""
+        (queue, self.queue) = (self.queue, [])
+        failed = [page.title() for (page, text, summary) in queue
+                  if not self.save(page, text, summary)]
+        if len(queue) > 1 or failed:
+            pywikibot.output('%d of %d pages saved.'
+                             % (len(queue) - len(failed), len(queue)))
+        for title in failed:
+            pywikibot.output('\03{lightred}Not saved: %s\03{default}' % title)
+        return failed
+
+class YearCache(object):
+    """Articles of years, fetched and indexed only once for several days.
+    
+    The cleaned lines of the articles are indexed by the dates (month and day,
+    without year) they contain, so the bot of a day has to look up only its
+    own lines instead of searching some 2000 articles with its dateregex.
+    """
+    
+    def __init__(self, site):
+        self.site = site
+        self.loaded = False
+        self.matcher = DateMatcher(site.lang)
+        self.pages = dict() # title => Page
+        self.texts = dict() # title => cleaned text tuple (see cleanup())
+        self.splits = dict() # title => splittemplates() of the introduction
+        self.index = dict() # (month, day) => list of (title, line)
+    
+    def add(self, page, texttuple):
+        """Store and index an article of a year."""
+        title = page.title()
+        self.pages[title] = page
+        self.texts[title] = texttuple
+        for line in (texttuple[0] + texttuple[1]).splitlines():
+            for day in self.matcher.dates(line):
+                self.index.setdefault(day, []).append((title, line))
+    
+    def load(self, bot):
+        """Fetch the articles of years unless they have already been."""
+        if self.loaded:
+            return
+        self.loaded = True
+        pywikibot.output('Loading the articles of years...')
+        for page in prefetch(bot.preload(bot.yearlist())):
+            texttuple = bot.cleantext(page)
+            if texttuple is not None:
+                self.add(page, texttuple)
+    
+    def apply(self, bot):
+        """Give the results for the bot's day to the bot."""
+        yearregex = bot.yearregex
+        for title in self.texts:
+            if not yearregex.search(title):
+                # Not an anniversary year, but it may mention one.
+                if title not in self.splits:
+                    self.splits[title] = splittemplates(self.texts[title][0])
+                bot.process(self.pages[title], self.texts[title],
+                            self.splits[title])
+        for (title, line) in self.index.get((bot.month, bot.day), []):
+            if yearregex.search(title):
+                bot.yearline(self.pages[title], line)
+
+class Session(object):
+    """What the bots of a run share: the site, the date formatter, the
+    compiled regexes of the titles of years and the caches.
+    
+    The bots of the days (see bot()) only keep their own results and date
+    regexes on top of it.
+    """
+    
+    def __init__(self, textcache=None, yearcache=None, timing=False):
+        """Constructor.
+        
+        Parameters:
+        textcache: a TextCache; optional
+            If given, only the pages changed since they were stored there
+            will be downloaded and cleaned.
+        yearcache: a YearCache to use instead of a new one; optional
+        timing: if True, the time spent on the stages of the processing is
+            measured in the stats of the bots (see Stats)
+        """
+        self.site = pywikibot.Site()
+        self.fd = date.FormatDate(self.site)
+        self.textcache = textcache
+        if yearcache is None:
+            yearcache = YearCache(self.site)
+        self.yearcache = yearcache
+        # The result pages are put here by the bots to be saved at the end.
+        self.savequeue = SaveQueue()
+        self.timing = timing
+        self.yearregexes = dict() # yearmodulo5 => compiled regex
+    
+    def yearregex(self, yearmodulo5):
+        """Return the compiled regex of the titles of the searched years."""
+        if yearmodulo5 in self.yearregexes:
+            return self.yearregexes[yearmodulo5]
+        # A regex for the titles of articles about years. I don't bother years
+        # b. C. because anniversaries would be confused anyhow.
+        # Listing b. C. years will seriously slow the program down!
+        # As in most wikis year articles have the title in the form of a simple
+        # number, and number articles have some addition, usually you
+        # don't have to modify this.
+        if yearmodulo5 is None: # 0 is not a year
+            # If you want to search anniversaries in every year:
+            regex = r'^[1-9]\d*$'
+        elif yearmodulo5 == 0: # 0 is not a year
+            # Will search for years with the appropriate ending modulo 5:
+            regex = r'^(\d+0|\d*5)$'
+        else:
+            regex = r'^\d*[%d%d]$' % (yearmodulo5, yearmodulo5 + 5)
+        self.yearregexes[yearmodulo5] = re.compile(regex, re.I)
+        return self.yearregexes[yearmodulo5]
+    
+    def bot(self, month, day, yearmodulo5=None, overwrite=False):
+        """Return a DailyBot of this session."""
+        return DailyBot(month, day, yearmodulo5, overwrite, self)
 
 class DailyBot(SingleSiteBot):
-    def __init__(self, month, day, yearmodulo5=None, overwrite=False):
+    def __init__(self, month, day, yearmodulo5=None, overwrite=False,
+                 session=None):
         """Constructor.
         
         Parameters:
@@ -130,71 +948,92 @@ class DailyBot(SingleSiteBot):
             with ending 3 and 8. If None, all the years are valid results.
         overwrite: if True, existence of the result page won't be checked,
             rather the target will be ruined and built again (defaults to False).
+        session: the Session shared among the bots of a run; optional
+            If not given, the bot will have a session of its own.
         """
-        super(DailyBot, self).__init__()
+        if session is None:
+            session = Session()
+        super(DailyBot, self).__init__(site=session.site)
         self.month = month
         self.day = day
         self.year5 = yearmodulo5
         self.overwrite = overwrite
+        self.session = session
+        self.yearcache = session.yearcache
+        self.textcache = session.textcache
+        self.savequeue = session.savequeue
+        self.fd = session.fd
+        self.yearregex = session.yearregex(yearmodulo5)
+        self.stats = Stats(session.timing)
         # This dictionary will contain the roles where the date is found.
         # Currently birth, death, infobox and other, and articles of years.
-        # Each list contains dictionaries with 'page', 'year' and 'text'.
+        # Each list contains dictionaries with 'page', 'revid', 'year', 'text',
+        # 'start' and 'end' (see show()).
         # 'year' is the sortkey and is not directly output.
+        self.cleardata()
+        (self.dateregex, self.dateregexwithyear) = dateregexes(
+            self.site.lang, self.month, self.day, self.year5)
+
+    def cleardata(self):
+        """Forget the results collected so far."""
         self.data = dict()
         self.data['births'] = [] # Currently not implemented yet.
         self.data['deaths'] = [] # Currently not implemented yet.
         self.data['infobox'] = []
         self.data['other'] = []
         self.data['years'] = []
-        # A regex for the titles of articles about years. I don't bother years
-        # b. C. because anniversaries would be confused anyhow.
-        # Listing b. C. years will seriously slow the program down!
-        # As in most wikis year articles have the title in the form of a simple
-        # number, and number articles have some addition, usually you
-        # don't have to modify this.
-        if self.year5 is None: # 0 is not a year
-            # If you want to search anniversaries in every year:
-            self.yearregex = r'^[1-9]\d*$'
-        elif self.year5 == 0: # 0 is not a year
-            # Will search for years with the appropriate ending modulo 5:
-            self.yearregex = r'^(\d+0|\d*5)$'
-        else:
-            self.yearregex = r'^\d*[%d%d]$' % (self.year5, self.year5 + 5)
-        # Create a regex which shows how the dates are written in your wiki.
-        # Think of various linking possibilities!
-        # This one does not contain year; may be used in the articles of years.
-        if self.day < 10:
-            r = r'0?%d' % self.day
-        else:
-            r = r'%d' % self.day
-        m = date.monthName(self.site.lang, self.month)
-        # ?P<year> identifies the year part (this is the sortkey for results)
-        # ?P<date> identifies the date part w/o year (currently not used AFAIK)
-        self.dateregex = re.compile(
-            r'(?Li)(\[{2})?(?P<date>%s *%s\.?)(\|.*?)?(\]{2})?(?!\d)' % (m, r))
-        # And this one with years (I don't treat 0 separately here)
-        # I use the bot with year5 only, so I may use it in regex,
-        # but if you use it without year5, don't use it here either!
-        self.dateregexwithyear = re.compile(
-        r'(?Li)(\[{2})?(?P<year>\d*[%d%d])(\]{2})?\.? *(\[{2})?(?P<date>%s *%s\.?)(\|.*?)?(\]{2})?(?!\d)' \
-            % (self.year5, self.year5 + 5, m, r))
-        self.fd = date.FormatDate(self.site)
-        gens = [self.list(self.month, self.day), self.yearlist()]
-        self.generator = pagegenerators.PreloadingGenerator(pagegenerators.CombinedPageGenerator(gens))
-        
+    
     def list(self, month, day):
         """ Return a page generator for the articles linking to the date. """
         daypage = pywikibot.Page(self.site, self.fd(month, day))
-        return pagegenerators.RegexFilterPageGenerator(
-            pagegenerators.NamespaceFilterPageGenerator(
-                pagegenerators.ReferringPageGenerator(daypage), 0, self.site),
-            exceptions, quantifier='none')
+        for page in pagegenerators.NamespaceFilterPageGenerator(
+                pagegenerators.ReferringPageGenerator(daypage), 0, self.site):
+            title = page.title()
+            if any(regex.search(title) for regex in exceptions):
+                self.stats.count('exceptions')
+            else:
+                yield page
  
     def yearlist(self):
         """ Return a page generator for the articles of years. """
         for i in range(1, datetime.datetime.today().year):
             yield pywikibot.Page(self.site, str(i))
     
+    def preload(self, generator, groupsize=50):
+        """Preload the pages of the generator in batches.
+        
+        Without textcache this is the same as PreloadingGenerator. With it
+        first only the revision IDs are fetched, and then the texts of the
+        pages that are not in the cache with that revision.
+        """
+        if self.textcache is None:
+            for page in pagegenerators.PreloadingGenerator(
+                    generator, groupsize):
+                yield page
+            return
+        batch = []
+        for page in generator:
+            batch.append(page)
+            if len(batch) == groupsize:
+                for page in self.preloadbatch(batch):
+                    yield page
+                batch = []
+        for page in self.preloadbatch(batch):
+            yield page
+    
+    def preloadbatch(self, batch):
+        """Return a batch of pages preloaded as needed for the textcache."""
+        if not batch:
+            return []
+        pages = list(self.site.preloadpages(batch, groupsize=len(batch),
+                                            content=False))
+        missing = [page for page in pages if page.exists() and
+                   self.textcache.get(page.title(),
+                                      page.latest_revision_id) is None]
+        if missing:
+            list(self.site.preloadpages(missing, groupsize=len(missing)))
+        return pages
+    
     def parse3(self, text):
         """Parse the text.
         
@@ -203,40 +1042,39 @@ class DailyBot(SingleSiteBot):
         B: text from the first section title to the first stopsection
         C: text from the first stopsection to the end.
         A and B will be returned as a tuple and poor C will be thrown away.
+        Section titles in disabled parts (see disabledspans()) don't count.
         """
-        lines = text.splitlines(1)
-        comeon = True
+        spans = disabledspans(text)
+        starts = [span[0] for span in spans]
+        def disabled(where):
+            # The last span starting before where is the only candidate.
+            i = bisect.bisect_left(starts, where) - 1
+            return i >= 0 and spans[i][1] > where
         where = 0
-        linenum = 0
-        tx1 = tx2 = ''
-        while comeon and linenum < len(lines):
-            line = lines[linenum]
-            if sectionpattern.match(line) and not pywikibot.isDisabled(text,where):
-                tx2 = line
-                comeon = False
-            else:
-                tx1 += line
+        begin = None # Where B begins
+        for line in text.splitlines(True):
+            if begin is None:
+                if sectionpattern.match(line) and not disabled(where):
+                    begin = where
+            elif stopsectionregex.match(line) and not disabled(where):
+                return (text[:begin], text[begin:where])
             where += len(line)
-            linenum += 1
-        comeon = True
-        while comeon and linenum < len(lines):
-            line = lines[linenum]
-            if stopsectionregex.match(line) and not pywikibot.isDisabled(text,where):
-                comeon = False
-            else:
-                tx2 += line
-            where += len(line)
-            linenum += 1
-        return (tx1, tx2)
+        if begin is None:
+            return (text, '')
+        return (text[:begin], text[begin:])
     
-    def template_processor(self, page, introtext):
+    def template_processor(self, page, introtext, split=None):
         """Process templates.
         
         Infoboxes in the introduction will be processed and removed.
         Other templates will just be removed (most often these are amboxes).
         page is needed as parameter for storing as result
+        split may be the result of splittemplates(introtext) if it is already
+        known (it does not depend on the day)
         """
-        templates = pywikibot.extract_templates_and_params(introtext)
+        if split is None:
+            split = splittemplates(introtext)
+        (templates, introtext) = split
         for t in templates:
             if re.search(infobox, t[0]):
                 # print t #debug only
@@ -246,18 +1084,23 @@ class DailyBot(SingleSiteBot):
                     m = self.dateregexwithyear.search(t[1][k])
                     if m:
                         # We have just found the date we are looking for :-)
-                        d = {
-                            'page': page,
-                            'year': int(m.group('year')),
-                            'text': k + ' = ' + m.group()
-                        }
-                        self.data['infobox'].append(d)
-                        # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
-        # Removal (must be repeated for nested templates):
-        while TEMP_REGEX.search(introtext):
-            introtext = TEMP_REGEX.sub('',introtext)
+                        self.infoboxhit(page, k, int(m.group('year')),
+                                        m.group())
         return introtext
     
+    def infoboxhit(self, page, name, year, datetext):
+        """Store a date found in the parameter name of an infobox."""
+        d = {
+            'page': page,
+            'revid': page.latest_revision_id,
+            'year': year,
+            'text': name + ' = ' + datetext,
+            'start': None,
+            'end': None
+        }
+        self.data['infobox'].append(d)
+        # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
+    
     def birthdeath(self, page, introtext):
         """ Trying to find birth and death dates in introduction. """
         # But not yet
@@ -268,19 +1111,29 @@ class DailyBot(SingleSiteBot):
  
         for m in self.dateregexwithyear.finditer(text):
             # print m.group()
-            minus = min(m.start(), 60)
-            plus = min(len(text) - m.end(), 60)
-            show = text[m.start()-minus : m.end()+plus].replace('\n', ' ')
-            show = show.replace('<', '&lt;') # Just in case
-            show = show.replace('>', '&gt;') # escape any <nowiki>s
-            show = "''<nowiki>" + show + "</nowiki>''"
-            d = {
-                'page': page,
-                'year': int(m.group('year')),
-                'text': show
-            }
-            self.data['other'].append(d)
-            # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
+            self.otherhit(page, int(m.group('year')), text, m.start(), m.end())
+    
+    def otherhit(self, page, year, text, start, end):
+        """Store a date found in text[start:end] with its surroundings.
+        
+        The surroundings are kept up to contextwidth, see show().
+        """
+        minus = min(start, contextwidth)
+        plus = min(len(text) - end, contextwidth)
+        d = {
+            'page': page,
+            'revid': page.latest_revision_id,
+            'year': year,
+            'text': text[start-minus : end+plus],
+            'start': minus,
+            'end': minus + end - start
+        }
+        self.data['other'].append(d)
+        # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
+    
+    def acceptyear(self, year):
+        """Return True if the year is searched by this bot."""
+        return self.year5 is None or year % 5 == self.year5
     
     def yearprocess(self, page, text):
         # This will be more simple.
@@ -288,43 +1141,110 @@ class DailyBot(SingleSiteBot):
             m = self.dateregex.search(line)
             if m:
                 # We have just found the date we are looking for :-)
-                if line.startswith('*'):
-                    line = line[1:]
-                show = line.replace('nowiki>', '') # Just in case
-                show = "''<nowiki>" + show + "</nowiki>''"
-                d = {
-                    'page': page,
-                    'year': int(page.title()),
-                    'text': show
-                }
-                self.data['years'].append(d)
-                # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
+                self.yearline(page, line)
     
-    def treat(self, page):
-        """ Process a page. """
+    def yearline(self, page, line):
+        """Store a matching line of an article of a year."""
+        d = {
+            'page': page,
+            'revid': page.latest_revision_id,
+            'year': int(page.title()),
+            'text': line,
+            'start': None,
+            'end': None
+        }
+        self.data['years'].append(d)
+        # pywikibot.output('\03{green}Bingó! ' + d['text'] + '\03{default}')
+    
+    def show(self, sect, item):
+        """Return the wikitext shown for a result of a section."""
+        text = item['text']
+        if sect == 'other':
+            (start, end) = (item['start'], item['end'])
+            text = text[max(start - snippetwidth, 0) : end + snippetwidth]
+            text = text.replace('\n', ' ')
+            text = text.replace('<', '&lt;') # Just in case
+            text = text.replace('>', '&gt;') # escape any <nowiki>s
+            return "''<nowiki>" + text + "</nowiki>''"
+        if sect == 'years':
+            if text.startswith('*'):
+                text = text[1:]
+            text = text.replace('nowiki>', '') # Just in case
+            return "''<nowiki>" + text + "</nowiki>''"
+        return text
+    
+    def cleanup(self, text):
+        """Prepare the text of a page for processing.
+        
+        References and comments are removed, and the result is split by
+        parse3(). The result does not depend on the day, so it may be shared
+        among several bots.
+        """
+        # First task is to remove references as they often contain dates of
+        # publishing. And HTML comments as well, because why not?
+        with self.stats.timer('cleanup'):
+            text = references.sub('', text)
+            text = HTMLcomments.sub('', text)
+        with self.stats.timer('parse3'):
+            return self.parse3(text)
+    
+    def cleantext(self, page):
+        """Return the cleaned text of the page (see cleanup()).
+        
+        The textcache is used if possible. Returns None for missing pages and
+        redirects.
+        """
+        if self.textcache is not None and page.exists():
+            texttuple = self.textcache.get(page.title(),
+                                           page.latest_revision_id)
+            if texttuple is not None:
+                self.stats.count('cached')
+                return texttuple
         try:
-            text = page.get()
+            with self.stats.timer('fetch'):
+                text = page.get()
         except pywikibot.NoPage:
-            return # Bot runs slowly, we cannot exclude a deletion meanwhile.
+            self.stats.count('missing')
+            return None # Bot runs slowly, we cannot exclude a deletion meanwhile.
         except pywikibot.IsRedirectPage:
+            self.stats.count('redirects')
+            return None
+        # pywikibot.output(text) # debug only
+        texttuple = self.cleanup(text)
+        if self.textcache is not None:
+            self.textcache.put(page.title(), page.latest_revision_id,
+                               texttuple)
+        return texttuple
+    
+    def treat(self, page):
+        """ Process a page. """
+        start = time.perf_counter()
+        texttuple = self.cleantext(page)
+        if texttuple is None:
             return
         # OK to run
         pywikibot.output('* [[%s]]' % page.title())
-        # pywikibot.output(text) # debug only
-        # First task is to remove references as they often contain dates of
-        # publishing. And HTML comments as well, because why not?
-        text = references.sub('', text)
-        text = HTMLcomments.sub('', text)
-        texttuple = self.parse3(text)
+        self.process(page, texttuple)
+        self.stats.count('pages')
+        self.stats.page(page.title(), time.perf_counter() - start)
+    
+    def process(self, page, texttuple, split=None):
+        """Process the cleaned text of a page (see cleanup()).
+        
+        For split see template_processor().
+        """
         # pywikibot.output(texttuple[1]) # debug only
-        if not re.compile(self.yearregex, re.I).search(page.title()):
-            introtext = self.template_processor(page, texttuple[0])
+        if not self.yearregex.search(page.title()):
+            with self.stats.timer('templates'):
+                introtext = self.template_processor(page, texttuple[0], split)
             # pywikibot.output(introtext) # debug only
-            self.birthdeath(page, introtext)
-            self.otherdates(page, introtext + texttuple[1])
+            with self.stats.timer('dates'):
+                self.birthdeath(page, introtext)
+                self.otherdates(page, introtext + texttuple[1])
         else: # An article of a year
             text = texttuple[0] + texttuple[1]
-            self.yearprocess(page, text)
+            with self.stats.timer('dates'):
+                self.yearprocess(page, text)
     
     def categories(self):
         """
@@ -335,25 +1255,30 @@ class DailyBot(SingleSiteBot):
         You may write here anything else you want to see at the bottom or
         return '' for leaving it empty.
         """
-        footer = u"\n[[Kategória:Évfordulók adatbázisa (’%d és ’%d)]]\n" % \
-            (self.year5, self.year5 + 5)
+        if self.year5 is None: # Every year
+            footer = u"\n[[Kategória:Évfordulók adatbázisa (minden év)]]\n"
+        else:
+            footer = u"\n[[Kategória:Évfordulók adatbázisa (’%d és ’%d)]]\n" % \
+                (self.year5, self.year5 + 5)
         footer += u"[[Kategória:Évfordulók adatbázisa (%s)]]\n" % \
             date.monthName(self.site.lang, self.month)
         return footer
     
-    def createpage(self, checkonly=False):
-        #global hiba - That's my own stuff.
-        # For localization modify the page name and 4 section titles below.
-        # Page will be created with the title basepage/daytitle.
-        # If checkonly is True, this method won't create anything, rather
-        # returns the title of the result page for checking its existence.
-        daytitle = '/’%d és ’%d/%02d-%02d' % \
+    def daytitle(self):
+        """Return the common part of the titles of the result page and the
+        template of the day.
+        """
+        # For localization modify the page name here, and the 4 section
+        # titles in render().
+        if self.year5 is None: # Every year
+            return '/minden év/%02d-%02d' % (self.month, self.day)
+        return '/’%d és ’%d/%02d-%02d' % \
             (self.year5, self.year5 + 5, self.month, self.day)
-        targetpage = basepage + daytitle # Where to save the result
-        if checkonly:
-            return targetpage
+    
+    def render(self):
+        """Return the text of the result page."""
         # The template which appears in the anniversaries section of main page:
-        templatepage = 'Sablon:Évfordulók' + daytitle
+        templatepage = 'Sablon:Évfordulók' + self.daytitle()
         sections = dict()
         # Section title for births (currently not implemented)
         sections['births'] = 'Születések'
@@ -380,54 +1305,621 @@ class DailyBot(SingleSiteBot):
                 outtext += '== '+ sections[sect] + ' ==\n'
                 for item in sorted(self.data[sect], key=lambda x: x['year']):
                     outtext += u"* '''%s''': %s\n" % (
-                            item['page'].title(asLink=True), item['text'])
+                            item['page'].title(asLink=True),
+                            self.show(sect, item))
         outtext += self.categories() # Anything you want to write at the bottom
+        return outtext
+    
+    def createpage(self, checkonly=False):
+        #global hiba - That's my own stuff.
+        # Page will be created with the title basepage/daytitle.
+        # If checkonly is True, this method won't create anything, rather
+        # returns the title of the result page for checking its existence.
+        daytitle = self.daytitle()
+        targetpage = basepage + daytitle # Where to save the result
+        if checkonly:
+            return targetpage
+        with self.stats.timer('createpage'):
+            outtext = self.render()
+        for (sect, items) in self.data.items():
+            self.stats.count('%s hits' % sect, len(items))
         pywikibot.output(outtext)
         # Write here your bot's summary:
         editsummary = 'Az évfordulók frissítése bottal'
  
         # And finally, we are ready to save the result!
         page = pywikibot.Page(self.site, targetpage)
-        try:
-            page.put(outtext, editsummary)
-        except:
-            pywikibot.output(daytitle + ' not saved.')
-            #hiba = True - That's my own stuff.
+        self.savequeue.add(page, outtext, editsummary)
     
-    def run(self):
-        pywikibot.output(self.fd(self.month, self.day))
+    def export(self):
+        """Return the results in a picklable form (titles instead of pages).
+        
+        Each result is a (title, revid, year, text, start, end) tuple.
+        """
+        return dict(
+            (sect, [(d['page'].title(), d['revid'], d['year'], d['text'],
+                     d['start'], d['end']) for d in items])
+            for (sect, items) in self.data.items())
+    
+    def merge(self, data):
+        """Add results returned by export() of another bot."""
+        for (sect, items) in data.items():
+            for (title, revid, year, text, start, end) in items:
+                d = {
+                    'page': pywikibot.Page(self.site, title),
+                    'revid': revid,
+                    'year': year,
+                    'text': text,
+                    'start': start,
+                    'end': end
+                }
+                self.data[sect].append(d)
+    
+    def skip(self, existing=None):
+        """Return True if the result page exists and must not be rebuilt.
+        
+        existing is an optional set of the titles of the existing result
+        pages, see unskipped(). If not given, the page is checked here.
+        """
         # Do we have to process anything at all? Depends on overwrite.
         if not self.overwrite:
             page = pywikibot.Page(self.site, self.createpage(checkonly=True))
-            if page.exists():
+            if existing is None:
+                found = page.exists()
+            else:
+                found = page.title() in existing
+            if found:
                 pywikibot.output(
                     '\03{lightyellow}' + page.title(asLink=True) + \
                     ' already exists, will be skipped.\03{default}' + \
                     '\nUse -noskip to force the bot to process it.')
-                return
+                return True
+        return False
+    
+    def crawl(self):
+        """Collect the results of the day without saving them."""
+        # Waiting time for the pages fetched ahead by the background thread
+        self.generator = self.stats.iterate('fetch', prefetch(self.preload(
+            self.list(self.month, self.day))))
+        with self.stats.timer('crawl'):
+            super(DailyBot, self).run()
+            self.yearcache.load(self)
+            self.yearcache.apply(self)
+    
+    def run(self):
+        pywikibot.output(self.fd(self.month, self.day))
+        if self.skip():
+            return
 
-        super(DailyBot, self).run()
+        self.crawl()
  
         # And finally:
         self.createpage()
+        self.savequeue.flush()
+
+class MultiDayProcessor(object):
+    """Process pages for the bots of several days at once.
+    
+    Every page is given to the bots of the days it links to, and its text is
+    searched only once for all of them with a DateMatcher. Articles of years
+    are indexed in a YearCache. Subclasses tell where the pages come from.
+    """
+    
+    def __init__(self, session, bots):
+        """Constructor.
+        
+        Parameters:
+        session: the Session of the bots
+        bots: list of DailyBot instances of the session (they won't crawl)
+        """
+        self.session = session
+        self.bots = bots
+        self.site = session.site
+        self.thisyear = datetime.datetime.today().year
+        self.yearcache = session.yearcache
+        # Normalized titles of day pages => bots of that day
+        self.bytitle = dict()
+        self.matcher = None
+        # The work done once for all the days is measured here, the bots
+        # only count their own pages and results.
+        self.stats = Stats(session.timing)
+        self.fetcher = None
+    
+    def prepare(self):
+        """Index the bots; must be called when self.bots is final."""
+        self.bytitle = dict()
+        for bot in self.bots:
+            title = self.normalize(bot.fd(bot.month, bot.day))
+            self.bytitle.setdefault(title, []).append(bot)
+        self.matcher = DateMatcher(
+            self.site.lang, [(bot.month, bot.day) for bot in self.bots])
+        # Fetches and cleans the pages for all the bots, with self.stats
+        first = self.bots[0]
+        self.fetcher = self.session.bot(first.month, first.day, first.year5,
+                                        True)
+        self.fetcher.stats = self.stats
+    
+    def normalize(self, title):
+        """Return a link target in a comparable form."""
+        title = ' '.join(title.replace('_', ' ').split())
+        return title[:1].upper() + title[1:]
+    
+    def linkedtitles(self, title, text):
+        """Return the titles the page links to.
+        
+        Here they are taken from the links written in the text, not those
+        coming from templates, so the results may be a bit shorter than
+        those of DailyBot.run().
+        """
+        return [m.group(1) for m in linkregex.finditer(text)]
+    
+    def daybots(self, links):
+        """Return the bots of the days among the linked titles."""
+        titles = set(self.normalize(link) for link in links)
+        bots = []
+        for title in titles:
+            bots.extend(self.bytitle.get(title, []))
+        return bots
+    
+    def isyear(self, title):
+        """Return True if the title is an article of a year (see yearlist())."""
+        return bool(re.match(r'^[1-9]\d*$', title)) and \
+            int(title) < self.thisyear
+    
+    def page(self, title, revid):
+        """Return a Page knowing its revision ID without asking the wiki."""
+        page = pywikibot.Page(self.site, title)
+        page._revid = revid # As if it were preloaded
+        return page
+    
+    def treattext(self, title, text, revid):
+        """Process the (uncleaned) text of a page of the main namespace.
+        
+        The days are those of linkedtitles().
+        """
+        if self.isyear(title):
+            # An article of a year, everybody needs it
+            page = self.page(title, revid)
+            self.yearcache.add(page, self.fetcher.cleanup(text))
+            return
+        if any(regex.search(title) for regex in exceptions):
+            return
+        bots = self.daybots(self.linkedtitles(title, text))
+        if not bots:
+            return
+        pywikibot.output('* [[%s]]' % title)
+        page = self.page(title, revid)
+        # Cleanup does not depend on the day, so it is done only once.
+        self.process(page, self.fetcher.cleanup(text), bots)
+    
+    def process(self, page, texttuple, bots):
+        """Process an article for several bots with one scan of the text.
+        
+        Does the same as DailyBot.process() for each of the bots, but with
+        DateMatcher instead of their own regexes.
+        """
+        days = dict() # (month, day) => bots
+        for bot in bots:
+            days.setdefault((bot.month, bot.day), []).append(bot)
+            bot.stats.count('pages')
+        with self.stats.timer('templates'):
+            (templates, introtext) = splittemplates(texttuple[0])
+        with self.stats.timer('dates'):
+            for (name, params) in templates:
+                if re.search(infobox, name):
+                    for k in params.keys():
+                        # Only the first date counts, as in search()
+                        done = set()
+                        for (month, day, year, span) in \
+                                self.matcher.finditer(params[k]):
+                            for bot in days.get((month, day), []):
+                                if bot not in done and bot.acceptyear(year):
+                                    done.add(bot)
+                                    bot.infoboxhit(page, k, year,
+                                                   params[k][span[0]:span[1]])
+            text = introtext + texttuple[1]
+            for (month, day, year, span) in self.matcher.finditer(text):
+                for bot in days.get((month, day), []):
+                    if bot.acceptyear(year):
+                        bot.otherhit(page, year, text, span[0], span[1])
 
-def one_month(month, yearmodulo5=None, overwrite=False):
-    """ Go throuh one month. """
+class DumpScanner(MultiDayProcessor):
+    """Process several days at once from a local XML dump.
+    
+    Instead of crawling the backlinks of every day page and all the articles
+    of years again for each day, the dump is read only once. Only the saving
+    of the results needs the wiki.
+    """
+    
+    def __init__(self, dumpfile, session, bots, store=None):
+        """Constructor.
+        
+        Parameters:
+        dumpfile: name of a pages-articles XML dump (may be bz2 compressed)
+        session, bots: see MultiDayProcessor
+        store: a HitStore to record the results in; optional
+        """
+        super(DumpScanner, self).__init__(session, bots)
+        self.dumpfile = dumpfile
+        self.store = store
+        self.latest = None # Timestamp of the latest revision in the dump
+    
+    def treat(self, entry):
+        """Process a page of the dump."""
+        if self.latest is None or entry.timestamp > self.latest:
+            self.latest = entry.timestamp
+        if entry.ns != '0' or entry.isredirect:
+            return
+        self.treattext(entry.title, entry.text, int(entry.revisionid))
+    
+    def run(self):
+        """Scan the dump and create the result pages."""
+        self.bots = unskipped(self.bots)
+        if not self.bots:
+            return
+        self.prepare()
+        pywikibot.output('Reading %s...' % self.dumpfile)
+        for entry in xmlreader.XmlDump(self.dumpfile).parse():
+            self.treat(entry)
+        for bot in self.bots:
+            self.yearcache.apply(bot)
+            if self.store is not None:
+                self.store.record(bot, self.snapshot())
+            bot.createpage()
+    
+    def snapshot(self):
+        """Return the time the results of the dump are valid for.
+        
+        That is the time of the latest revision in the dump, less a day,
+        as writing a dump takes hours, and the pages written first may
+        miss some edits before that. The pages changed in between are
+        just processed again by the next incremental run.
+        """
+        if self.latest is None: # An empty dump
+            return pywikibot.Timestamp.utcnow()
+        return pywikibot.Timestamp.fromISOformat(self.latest) - \
+            datetime.timedelta(days=1)
+
+class BacklinkScanner(MultiDayProcessor):
+    """Process several days at once from the backlinks of their pages.
+    
+    The backlinks of all the day pages are collected first, so an article
+    linking to several days is fetched and parsed only once for all of
+    them. The fetching is measured in the stats of the scanner, not in
+    those of the days.
+    """
+    
+    def __init__(self, session, bots, store=None):
+        """Constructor.
+        
+        Parameters:
+        session, bots: see MultiDayProcessor
+        store: a HitStore to record the results in; optional
+        """
+        super(BacklinkScanner, self).__init__(session, bots)
+        self.store = store
+    
+    def plan(self):
+        """Return the articles to be processed and the bots of each.
+        
+        Returns two dictionaries with titles as keys: one with the pages,
+        and one with the bots of the days the page links to.
+        """
+        pages = dict()
+        days = dict()
+        for bot in self.bots:
+            daypage = pywikibot.Page(self.site, bot.fd(bot.month, bot.day))
+            for page in pagegenerators.ReferringPageGenerator(daypage):
+                title = page.title()
+                if title not in days:
+                    days[title] = []
+                    pages[title] = page
+                days[title].append(bot)
+        # Filtered once for all the days
+        for (title, page) in list(pages.items()):
+            if page.namespace() != 0:
+                del pages[title]
+            elif any(regex.search(title) for regex in exceptions):
+                self.stats.count('exceptions')
+                del pages[title]
+        return (pages, days)
+    
+    def run(self):
+        """Process the articles and create the result pages."""
+        self.prepare()
+        started = pywikibot.Timestamp.utcnow()
+        (pages, days) = self.plan()
+        pywikibot.output('%d articles link to the %d days.'
+                         % (len(pages), len(self.bots)))
+        fetcher = self.fetcher
+        with self.stats.timer('crawl'):
+            for page in self.stats.iterate('fetch', prefetch(
+                    fetcher.preload(iter(pages.values())))):
+                start = time.perf_counter()
+                texttuple = fetcher.cleantext(page)
+                if texttuple is None:
+                    continue
+                pywikibot.output('* [[%s]]' % page.title())
+                self.process(page, texttuple, days[page.title()])
+                self.stats.count('articles')
+                self.stats.page(page.title(), time.perf_counter() - start)
+            self.yearcache.load(fetcher)
+        for bot in self.bots:
+            self.yearcache.apply(bot)
+            if self.store is not None:
+                self.store.record(bot, started)
+            bot.createpage()
+
+class IncrementalUpdater(MultiDayProcessor):
+    """Update the result pages recorded in a HitStore by recent changes.
+    
+    Only the pages changed since the previous run are fetched and searched,
+    and only the result pages of the days they had or have results for are
+    rebuilt, from the results in the store.
+    """
+    
+    def __init__(self, session, store, changesfile=None):
+        """Constructor.
+        
+        Parameters:
+        session: a Session for the bots of the days in the store
+        store: a HitStore filled by a previous run with the same store
+        changesfile: a JSON file with a list of recent changes to use instead
+            of asking the wiki; each item is like those of the API
+            (list=recentchanges), at least with 'title' and 'timestamp'
+        """
+        self.store = store
+        self.changesfile = changesfile
+        bots = [session.bot(month, day, year5, True)
+                for (month, day, year5) in store.targets()]
+        super(IncrementalUpdater, self).__init__(session, bots)
+    
+    def changes(self, since):
+        """Yield the recent changes of the main namespace since a time."""
+        if self.changesfile:
+            with open(self.changesfile, encoding='utf-8') as f:
+                changes = json.load(f)
+            for change in changes:
+                if change['timestamp'] >= since.isoformat() and \
+                        change.get('ns', 0) == 0:
+                    yield change
+            return
+        for change in self.site.recentchanges(start=since, reverse=True,
+                                              namespaces=[0]):
+            yield change
+    
+    def linkedtitles(self, title, text):
+        """Return the titles the page links to, as the wiki knows them.
+        
+        Unlike the links in the text, these include the links coming from
+        templates and those through redirects, as the backlinks of the
+        days in a full run (see BacklinkScanner.plan()).
+        """
+        page = pywikibot.Page(self.site, title)
+        return [link.title() for link in page.linkedPages(
+            namespaces=0, follow_redirects=True)]
+    
+    def oldestchange(self):
+        """Return the time of the oldest recent change kept by the wiki."""
+        for change in self.site.recentchanges(reverse=True, total=1):
+            return pywikibot.Timestamp.fromISOformat(change['timestamp'])
+        return None
+    
+    def changedtitles(self, since):
+        """Return the titles of the pages edited, created or deleted."""
+        titles = set()
+        for change in self.changes(since):
+            titles.add(change['title'])
+            # The new title of a moved page
+            target = change.get('logparams', {}).get('target_title')
+            if target:
+                titles.add(target)
+        return titles
+    
+    def run(self):
+        """Process the changed pages and rebuild the affected result pages."""
+        if not self.bots:
+            pywikibot.error('The store is empty; do a full run with -store '
+                            'first.')
+            return
+        self.prepare()
+        since = self.store.since()
+        started = pywikibot.Timestamp.utcnow()
+        if not self.changesfile:
+            oldest = self.oldestchange()
+            if oldest is not None and since < oldest:
+                # The changes in between are gone, the results would stay
+                # stale.
+                pywikibot.error('The previous run (%s) is older than the '
+                                'oldest recent change (%s); do a full run '
+                                'with -store instead.'
+                                % (since.isoformat(), oldest.isoformat()))
+                return
+        titles = self.changedtitles(since)
+        pywikibot.output('%d pages changed since %s'
+                         % (len(titles), since.isoformat()))
+        if not titles:
+            return
+        # Days having results from these pages before the changes
+        affected = self.store.targetsof(titles)
+        pages = pagegenerators.PreloadingGenerator(
+            pywikibot.Page(self.site, title) for title in sorted(titles))
+        for page in pages:
+            try:
+                text = page.get()
+            except pywikibot.NoPage:
+                continue # Deleted or moved, its results just disappear
+            except pywikibot.IsRedirectPage:
+                continue
+            self.treattext(page.title(), text, page.latest_revision_id)
+        for bot in self.bots:
+            self.yearcache.apply(bot)
+            if any(bot.data.values()):
+                affected.add((bot.month, bot.day, bot.year5))
+        self.store.replace(titles, self.bots, started)
+        for bot in self.bots:
+            if (bot.month, bot.day, bot.year5) in affected:
+                pywikibot.output(bot.fd(bot.month, bot.day))
+                bot.cleardata()
+                bot.merge(self.store.data(bot.month, bot.day, bot.year5))
+                bot.createpage()
+        self.session.savequeue.flush()
+
+# The Session of a worker process of run_days()
+_session = None
+
+def _initworker(yearcache, textcache, timing):
+    """Initialize a worker process of run_days()."""
+    global _session
+    # Forked workers must not share the keep-alive connections of the parent.
+    http.session.close()
+    _session = Session(textcache, yearcache, timing)
+
+def _crawlday(target):
+    """Collect the results of a (month, day, yearmodulo5) in a worker.
+    
+    Returns the results (see DailyBot.export()) and the Stats of the day.
+    """
+    (month, day, yearmodulo5) = target
+    bot = _session.bot(month, day, yearmodulo5, True)
+    bot.crawl()
+    if _session.textcache is not None:
+        _session.textcache.commit(True)
+    return (bot.export(), bot.stats)
+
+def writestats(statsfile, bots, stats):
+    """Write the Stats of the days and of the whole run into a JSON file."""
+    summary = {
+        'days': dict(('%02d-%02d' % (bot.month, bot.day), bot.stats.summary())
+                     for bot in bots),
+        'run': stats.summary(),
+    }
+    with open(statsfile, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, sort_keys=True)
+    pywikibot.output('Statistics written to %s.' % statsfile)
+
+def run_days(days, yearmodulo5=None, overwrite=False, dumpfile=None,
+             workers=1, textcache=None, store=None, statsfile=None):
+    """
+    Go through the given days.
+    
+    days is a list of (month, day) tuples. With a dumpfile every day is
+    processed in the same pass over the dump, otherwise the articles linking
+    to any of the days are fetched once for all the days (see
+    BacklinkScanner), and so are the articles of years.
+    If workers is more than 1, the days are crawled one by one instead, by so
+    many processes in parallel, and the results are saved here in the order
+    of the days.
+    textcache is an optional TextCache for the pages fetched from the wiki.
+    store is an optional HitStore to record the results in.
+    If statsfile is given, the time spent on the stages of the processing is
+    measured, and written into that file as JSON (see Stats).
+    The result pages are saved at the end, after all the days are done.
+    """
+    timing = statsfile is not None
+    stats = Stats(timing) # Of the whole run
+    session = Session(textcache, timing=timing)
+    bots = [session.bot(month, day, yearmodulo5, overwrite)
+            for (month, day) in days]
+    if dumpfile:
+        with stats.timer('crawl'):
+            scanner = DumpScanner(dumpfile, session, bots, store)
+            scanner.run()
+        stats.add(scanner.stats)
+    else:
+        started = pywikibot.Timestamp.utcnow()
+        bots = unskipped(bots)
+        if not bots:
+            return
+        if workers > 1:
+            # Loaded here once, the workers inherit it. Measured in the
+            # stats of the run, as in MultiDayProcessor.prepare().
+            first = bots[0]
+            fetcher = session.bot(first.month, first.day, first.year5, True)
+            fetcher.stats = stats
+            session.yearcache.load(fetcher)
+            if textcache is not None:
+                # Nothing of the parent may be pending when the workers
+                # start writing.
+                textcache.commit(True)
+            targets = [(bot.month, bot.day, bot.year5) for bot in bots]
+            with multiprocessing.Pool(
+                    workers, _initworker,
+                    (session.yearcache, textcache, timing)) as pool:
+                for (bot, (data, daystats)) in zip(
+                        bots, pool.imap(_crawlday, targets)):
+                    bot.merge(data)
+                    bot.stats.add(daystats)
+                    if store is not None:
+                        store.record(bot, started)
+                    bot.createpage()
+        elif len(bots) > 1:
+            scanner = BacklinkScanner(session, bots, store)
+            scanner.run()
+            stats.add(scanner.stats)
+        else:
+            for bot in bots:
+                pywikibot.output(bot.fd(bot.month, bot.day))
+                bot.crawl()
+                if store is not None:
+                    store.record(bot, started)
+                bot.createpage()
+    with stats.timer('save'):
+        session.savequeue.flush()
+    if timing:
+        for bot in bots:
+            stats.add(bot.stats)
+        writestats(statsfile, bots, stats)
+
+def render_days(store):
+    """
+    Build the result pages of all the days in the store again.
+    
+    Nothing is fetched, the results are taken from the store. Useful when
+    only the look of the pages is changed (header, categories(), the sections
+    in render() or snippetwidth).
+    """
+    session = Session()
+    for (month, day, yearmodulo5) in store.targets():
+        bot = session.bot(month, day, yearmodulo5, True)
+        bot.merge(store.data(month, day, yearmodulo5))
+        bot.createpage()
+    session.savequeue.flush()
+
+def one_month(month, yearmodulo5=None, overwrite=False, **options):
+    """
+    Go throuh one month.
+    
+    Other keyword arguments are passed to run_days().
+    """
     if month not in range(1, 13):
         return
     if yearmodulo5 is not None and (yearmodulo5 < 0 or yearmodulo5 > 4):
         return
-    for i in range(1, date.getNumberOfDaysInMonth(month)+1):
-        bot = DailyBot(month, i, yearmodulo5, overwrite)
-        bot.run()
+    days = [(month, i)
+            for i in range(1, date.getNumberOfDaysInMonth(month)+1)]
+    run_days(days, yearmodulo5, overwrite, **options)
 
-def nextmonth(withmodulo5=False, overwrite=False):
+def one_year(yearmodulo5=None, overwrite=False, **options):
+    """
+    Go through every day of the year.
+    
+    Other keyword arguments are passed to run_days().
+    """
+    if yearmodulo5 is not None and (yearmodulo5 < 0 or yearmodulo5 > 4):
+        return
+    days = [(month, i) for month in range(1, 13)
+            for i in range(1, date.getNumberOfDaysInMonth(month)+1)]
+    run_days(days, yearmodulo5, overwrite, **options)
+
+def nextmonth(withmodulo5=False, overwrite=False, **options):
     """
     Go through the next month.
     
     Parameter withmodulo5:
         If True, it looks anniversaries for the current year modulo 5 (see doc)
         If False, it takes every year
+    Other keyword arguments are passed to run_days().
     """
     today = datetime.datetime.today()
     nextM = today.month + 1
@@ -437,28 +1929,81 @@ def nextmonth(withmodulo5=False, overwrite=False):
         nextY += 1
     print ('year=%d, month=%d' % (nextY, nextM))
     if withmodulo5:
-        one_month(nextM, nextY % 5, overwrite)
+        one_month(nextM, nextY % 5, overwrite, **options)
     else:
-        one_month(nextM, overwrite=overwrite)
+        one_month(nextM, overwrite=overwrite, **options)
+
+def nextyear(withmodulo5=False, overwrite=False, **options):
+    """
+    Go through the next year.
+    
+    Parameters: see nextmonth()
+    """
+    nextY = datetime.datetime.today().year + 1
+    print ('year=%d' % nextY)
+    if withmodulo5:
+        one_year(nextY % 5, overwrite, **options)
+    else:
+        one_year(overwrite=overwrite, **options)
 
 def main(*args):
     mode = None
     overwrite = False
+    options = dict() # Passed to run_days()
+    cachefile = None
+    cachesize = 200
+    storefile = None
+    changesfile = None
     for arg in pywikibot.handleArgs(*args):
-        if arg in ['nextmonth', 'nextmonth5']:
+        if arg in ['nextmonth', 'nextmonth5', 'nextyear', 'nextyear5',
+                   'incremental', 'render']:
             mode = arg
         elif arg == '-noskip':
             overwrite = True
-    if mode == 'nextmonth':
-        nextmonth(overwrite=overwrite)
-    elif mode == 'nextmonth5':
-        nextmonth(True, overwrite)
-    else:
-        # Wired-in behaviour
-        # Callbot takes month, day and a year ending between 0 and 4 (year%5).
-        # Sample:
-        bot = DailyBot(4, 1, 4, overwrite)
-        bot.run()
+        elif arg.startswith('-dump:'):
+            options['dumpfile'] = arg[len('-dump:'):]
+        elif arg.startswith('-workers:'):
+            options['workers'] = int(arg[len('-workers:'):])
+        elif arg.startswith('-cache:'):
+            cachefile = arg[len('-cache:'):]
+        elif arg.startswith('-cachesize:'):
+            cachesize = int(arg[len('-cachesize:'):])
+        elif arg.startswith('-store:'):
+            storefile = arg[len('-store:'):]
+        elif arg.startswith('-changes:'):
+            changesfile = arg[len('-changes:'):]
+        elif arg.startswith('-stats:'):
+            options['statsfile'] = arg[len('-stats:'):]
+    if cachefile:
+        options['textcache'] = TextCache(cachefile, cachesize)
+    if storefile:
+        options['store'] = HitStore(storefile)
+    if mode in ['incremental', 'render'] and not storefile:
+        pywikibot.error('%s needs -store.' % mode)
+        return
+    try:
+        if mode == 'incremental':
+            IncrementalUpdater(Session(), options['store'], changesfile).run()
+        elif mode == 'render':
+            render_days(options['store'])
+        elif mode == 'nextmonth':
+            nextmonth(overwrite=overwrite, **options)
+        elif mode == 'nextmonth5':
+            nextmonth(True, overwrite, **options)
+        elif mode == 'nextyear':
+            nextyear(overwrite=overwrite, **options)
+        elif mode == 'nextyear5':
+            nextyear(True, overwrite, **options)
+        else:
+            # Wired-in behaviour
+            # Callbot takes month, day and a year ending between 0 and 4 (year%5).
+            # Sample:
+            run_days([(4, 1)], 4, overwrite, **options)
+    finally:
+        if cachefile:
+            options['textcache'].close()
+        if storefile:
+            options['store'].close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,282 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks for anniversary.py.
+
+Usage:
+
+    python pwb.py anniversary_bench -matcher [-month:4] [file1 file2 ...]
+    python pwb.py anniversary_bench -stages [-corpus:DIR] [-month:4] [-day:1]
+        [-year5:4] [-baseline:FILE [-threshold:10]] [-save:FILE]
+
+The files contain the wikitext of articles, one article per file. The name
+of the file without extension is the title of the article (with _ instead
+of spaces), so that articles of years (e.g. 1849.txt) are processed as
+such. Without files the fixed corpus of tests/data/anniversary is used, so
+that the results of different runs can be compared. Nothing is fetched
+from the wiki but the site information.
+
+-matcher    compares the per-day regexes of dateregexes() with one
+            DateMatcher searching every day of the month at once
+-stages     times the stages of DailyBot on the articles one by one:
+            stripping of references and comments, parse3(),
+            template_processor(), otherdates(), yearprocess() and render()
+-corpus:    a directory of article files, used besides the ones listed,
+            instead of the fixed corpus
+-month:     the month to search (default: 4)
+-day:       the day to search with -stages (default: 1)
+-year5:     the year ending to search with -stages (default: 4)
+-baseline:  a JSON file written by -save earlier; -stages fails (with exit
+            status 1) if any stage got slower than that by more than the
+            threshold
+-threshold: allowed slowdown in percent (default: 10)
+-save:      writes the results of -stages into a JSON file to be used as
+            baseline later
+"""
+import json
+import os
+import sys
+import time
+
+import pywikibot
+from pywikibot import date
+
+import anniversary
+
+# The fixed corpus, articles and articles of years
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests',
+                        'data', 'anniversary')
+
+
+class FixturePage(object):
+    """The title of a file of the corpus, standing for a Page."""
+
+    def __init__(self, title):
+        self._title = title
+        self.latest_revision_id = 0
+
+    def title(self, asLink=False):
+        if asLink:
+            return '[[%s]]' % self._title
+        return self._title
+
+
+def bench(function, repeat=5, mintime=0.2):
+    """Return the best wall time of function() in seconds.
+
+    As with timeit, function() is called as many times in a row as needed to
+    take at least mintime seconds, so that a small corpus is measured
+    precisely too.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= mintime:
+            break
+        number *= 2
+    best = elapsed / number
+    for i in range(repeat - 1):
+        start = time.perf_counter()
+        for i in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def matcher(texts, lang, month):
+    """Compare the date regexes of the days of a month with DateMatcher."""
+    days = [(month, day)
+            for day in range(1, date.getNumberOfDaysInMonth(month) + 1)]
+    regexes = [anniversary.dateregexes(lang, m, d)[1] for (m, d) in days]
+    datematcher = anniversary.DateMatcher(lang, days)
+    hits = dict()
+
+    def perday():
+        hits['per-day regexes'] = sum(
+            1 for text in texts for regex in regexes
+            for m in regex.finditer(text))
+
+    def single():
+        hits['DateMatcher'] = sum(
+            1 for text in texts for hit in datematcher.finditer(text))
+
+    size = sum(len(text.encode('utf-8')) for text in texts)
+    pywikibot.output('%d texts, %.1f MB, %d days'
+                     % (len(texts), size / 2 ** 20, len(days)))
+    for (name, function) in [('per-day regexes', perday),
+                             ('DateMatcher', single)]:
+        elapsed = bench(function)
+        pywikibot.output('%-16s %8.3f s %8.2f MB/s %6d hits'
+                         % (name, elapsed, size / elapsed / 2 ** 20,
+                            hits[name]))
+
+
+def stages(articles, month, day, yearmodulo5):
+    """Time the stages of DailyBot separately.
+
+    articles is a list of (title, text) tuples. Returns a dictionary of
+    stage name => dictionary of seconds, pages/s and MB/s.
+    """
+    bot = anniversary.DailyBot(month, day, yearmodulo5, True)
+    yearregex = bot.yearregex
+    pages = [(FixturePage(title), text) for (title, text) in articles]
+    years = [(page, text) for (page, text) in pages
+             if yearregex.search(page.title())]
+    others = [(page, text) for (page, text) in pages
+              if not yearregex.search(page.title())]
+    # The input of each stage is the output of the previous one.
+    stripped = [(page, anniversary.HTMLcomments.sub(
+        '', anniversary.references.sub('', text))) for (page, text) in others]
+    parsed = [(page, bot.parse3(text)) for (page, text) in stripped]
+    intros = [(page, bot.template_processor(page, texttuple[0]), texttuple[1])
+              for (page, texttuple) in parsed]
+    yeartexts = [(page, ''.join(bot.cleanup(text))) for (page, text) in years]
+    bot.cleardata()
+
+    def strip():
+        for (page, text) in others:
+            text = anniversary.references.sub('', text)
+            anniversary.HTMLcomments.sub('', text)
+
+    def parse3():
+        for (page, text) in stripped:
+            bot.parse3(text)
+
+    def template_processor():
+        bot.cleardata()
+        for (page, texttuple) in parsed:
+            bot.template_processor(page, texttuple[0])
+
+    def otherdates():
+        bot.data['other'] = []
+        for (page, introtext, body) in intros:
+            bot.otherdates(page, introtext + body)
+
+    def yearprocess():
+        bot.data['years'] = []
+        for (page, text) in yeartexts:
+            bot.yearprocess(page, text)
+
+    def render():
+        bot.render()
+
+    def size(texts):
+        return sum(len(text.encode('utf-8')) for text in texts)
+
+    tasks = [
+        ('strip', strip, len(others), size(text for (page, text) in others)),
+        ('parse3', parse3, len(stripped),
+         size(text for (page, text) in stripped)),
+        ('template_processor', template_processor, len(parsed),
+         size(texttuple[0] for (page, texttuple) in parsed)),
+        ('otherdates', otherdates, len(intros),
+         size(introtext + body for (page, introtext, body) in intros)),
+        ('yearprocess', yearprocess, len(yeartexts),
+         size(text for (page, text) in yeartexts)),
+        # The results of all the stages above are on one page.
+        ('render', render, 1, 0),
+    ]
+    pywikibot.output('%d articles, %d articles of years, %.1f MB'
+                     % (len(others), len(years),
+                        size(text for (title, text) in articles) / 2 ** 20))
+    results = dict()
+    for (name, function, count, nbytes) in tasks:
+        elapsed = bench(function)
+        results[name] = {
+            'seconds': elapsed,
+            'pages/s': count / elapsed if elapsed else 0,
+            'MB/s': nbytes / elapsed / 2 ** 20 if elapsed else 0,
+        }
+        pywikibot.output('%-18s %8.3f s %9.1f pages/s %8.2f MB/s'
+                         % (name, elapsed, results[name]['pages/s'],
+                            results[name]['MB/s']))
+    pywikibot.output('%d infobox, %d other and %d year results'
+                     % (len(bot.data['infobox']), len(bot.data['other']),
+                        len(bot.data['years'])))
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """Return the names of the stages slower than in the baseline."""
+    slower = []
+    for (name, result) in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]['seconds']
+        change = (result['seconds'] - before) / before * 100 if before else 0
+        pywikibot.output('%-18s %+7.1f %%' % (name, change))
+        if change > threshold:
+            slower.append(name)
+    return slower
+
+
+def readcorpus(filenames):
+    """Return the (title, text) tuples of the files."""
+    articles = []
+    for filename in filenames:
+        title = os.path.splitext(os.path.basename(filename))[0]
+        with open(filename, encoding='utf-8') as f:
+            articles.append((title.replace('_', ' '), f.read()))
+    return articles
+
+
+def main(*args):
+    mode = None
+    month = 4
+    day = 1
+    yearmodulo5 = 4
+    baselinefile = None
+    savefile = None
+    threshold = 10
+    files = []
+    for arg in pywikibot.handle_args(args):
+        if arg in ['-matcher', '-stages']:
+            mode = arg
+        elif arg.startswith('-month:'):
+            month = int(arg[len('-month:'):])
+        elif arg.startswith('-day:'):
+            day = int(arg[len('-day:'):])
+        elif arg.startswith('-year5:'):
+            yearmodulo5 = int(arg[len('-year5:'):])
+        elif arg.startswith('-corpus:'):
+            corpus = arg[len('-corpus:'):]
+            files.extend(os.path.join(corpus, name)
+                         for name in sorted(os.listdir(corpus)))
+        elif arg.startswith('-baseline:'):
+            baselinefile = arg[len('-baseline:'):]
+        elif arg.startswith('-threshold:'):
+            threshold = float(arg[len('-threshold:'):])
+        elif arg.startswith('-save:'):
+            savefile = arg[len('-save:'):]
+        else:
+            files.append(arg)
+    if not mode:
+        pywikibot.error('Please specify a benchmark')
+        return
+    if not files:
+        files = [os.path.join(fixtures, name)
+                 for name in sorted(os.listdir(fixtures))]
+    articles = readcorpus(files)
+    if mode == '-matcher':
+        matcher([text for (title, text) in articles], pywikibot.Site().lang,
+                month)
+        return
+    results = stages(articles, month, day, yearmodulo5)
+    if savefile:
+        with open(savefile, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if baselinefile:
+        with open(baselinefile, encoding='utf-8') as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, threshold)
+        if slower:
+            pywikibot.error('Slower than the baseline by more than %g %%: %s'
+                            % (threshold, ', '.join(slower)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,32 @@ Usage:
 
 * python pwb.py params_all -transcludes:"..."
 * python pwb.py params_all [generators] -template:"..."
+* python pwb.py params_all [generators] -templatecat:"..."
 
 This will work on all pages that transclude the template.
 
+-template and -transcludes may be given several times, and -templatecat
+takes all the templates in a category. Each page is then fetched only once,
+and the parameters of each template are written into a file of its own
+(params_<template>.tsv, or the -outputfile name with %s replaced by the
+template).
+
+-dump:FILE reads the pages from a local XML dump (may be compressed)
+instead of the wiki; only the redirects of the templates are fetched. The
+pages are parsed by -workers:N processes (by default one per CPU).
+
+At the end a summary of each template is printed: how many times each
+parameter is used and left empty, its most common values, and the
+parameters missing from the source of the template with the pages using
+them. -sqlite:FILE also writes the rows into an SQLite database, one
+(template, row, title, param, value) record per parameter, indexed by
+template, parameter and value.
+
+The state of the run is saved every minute into a checkpoint file (the name
+of the first output file followed by .checkpoint, or -checkpoint:FILE).
+If the run is stopped, -resume continues after the last page processed,
+appending to the rows written before.
+
 These command line parameters can be used to specify which pages to work on:
 
 &params;
@@ -28,10 +51,19 @@ Examples:
 from __future__ import absolute_import, unicode_literals
 
 import codecs
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
 import signal
+import sqlite3
+import time
 
 import pywikibot
-from pywikibot import pagegenerators as pg, textlib, bot
+from pywikibot import pagegenerators as pg, textlib, bot, xmlreader
 from pywikibot.bot import SingleSiteBot
 
 docuReplacements = {'&params;': pywikibot.pagegenerators.parameterHelp}
@@ -49,24 +81,414 @@ def _signal_handler(signal, frame):
 
 signal.signal(signal.SIGINT, _signal_handler)
 
+braces = re.compile(r'\{+|\}+')
+
+def titleregex(titles):
+    """Return a regex matching the beginning of a template of the titles.
+
+    The first letter may be of either case, the words may be separated by
+    spaces or underscores, and a namespace prefix is allowed.
+    """
+    alternatives = []
+    for title in sorted(titles, key=len, reverse=True):
+        first = title[:1]
+        if first.upper() != first.lower():
+            first = '[%s%s]' % (re.escape(first.upper()),
+                                re.escape(first.lower()))
+        else:
+            first = re.escape(first)
+        words = re.split('[ _]+', title[1:])
+        alternatives.append(first + '[ _]+'.join(re.escape(word)
+                                                 for word in words))
+    return re.compile(r'\{\{\s*(?:[^{}|\n]*?:\s*)?(?:%s)\s*(?=[|}])'
+                      % '|'.join(alternatives))
+
+def templatespans(text, regex):
+    """Yield the texts of the templates whose beginning matches the regex.
+
+    Templates inside a template yielded earlier are not yielded again.
+    The braces are matched as by MediaWiki: {{{ opens a parameter to be
+    closed by }}}, and e.g. {{{{{ is {{ followed by {{{.
+    """
+    end = 0
+    for match in regex.finditer(text):
+        if match.start() < end:
+            continue
+        stack = []  # Number of braces of the open templates and parameters
+        for run in braces.finditer(text, match.start()):
+            n = len(run.group())
+            if run.group()[0] == '{':
+                while n >= 2:
+                    size = 3 if n == 3 else 2
+                    stack.append(size)
+                    n -= size
+                continue
+            closed = 0
+            while n - closed >= 2 and stack:
+                closed += 3 if stack.pop() == 3 and n - closed >= 3 else 2
+                if not stack:
+                    end = run.start() + closed
+                    yield text[match.start():end]
+                    break
+            if not stack:
+                break
+
+def extract(text, regex):
+    """Return the templates and params of the matching templates only.
+
+    Comments, nowiki, pre and includeonly parts are removed first, so
+    neither the templates nor the braces in them count.
+    """
+    templates = []
+    text = textlib.removeDisabledParts(text)
+    for span in templatespans(text, regex):
+        templates.extend(textlib.extract_templates_and_params(span))
+    return templates
+
+_prefilter = None
+
+def _initworker(prefilter):
+    """Initialize a worker process; ctrl-c is handled by the parent."""
+    global _prefilter
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _prefilter = prefilter
+
+def _extract(item):
+    """Return the title and the templates of a (title, text) in a worker."""
+    (title, text) = item
+    return (title, extract(text, _prefilter))
+
+class ParameterStats(object):
+    """Counts of the parameters of one template, collected row by row.
+
+    The most common values are estimated by the space-saving algorithm, so
+    at most `capacity` values are kept per parameter.
+    """
+
+    def __init__(self, known=None, capacity=50):
+        """
+        Constructor.
+
+        Arguments:
+            * known         - The parameter names used in the template, or
+                              None if they are not known
+            * capacity      - Number of values counted per parameter
+        """
+        self.known = known
+        self.capacity = capacity
+        self.transclusions = 0
+        self.used = {}  # Parameter name => number of rows
+        self.empty = {}  # Parameter name => number of rows with empty value
+        self.values = {}  # Parameter name => {value: [count, error]}
+        self.unknown = {}  # Parameter name => [number of rows, some titles]
+
+    def add(self, title, fields):
+        """Count a row given as a list of (parameter, value)."""
+        self.transclusions += 1
+        for (param, value) in fields:
+            self.used[param] = self.used.get(param, 0) + 1
+            if self.known is not None and param not in self.known:
+                unknown = self.unknown.setdefault(param, [0, []])
+                unknown[0] += 1
+                if len(unknown[1]) < 5 and title not in unknown[1]:
+                    unknown[1].append(title)
+            if not value:
+                self.empty[param] = self.empty.get(param, 0) + 1
+                continue
+            counters = self.values.setdefault(param, {})
+            if value in counters:
+                counters[value][0] += 1
+            elif len(counters) < self.capacity:
+                counters[value] = [1, 0]
+            else:
+                # The least counted value gives its place to the new one,
+                # whose count may be overestimated by that much.
+                victim = min(counters, key=lambda v: counters[v][0])
+                count = counters.pop(victim)[0]
+                counters[value] = [count + 1, count]
+
+    def state(self):
+        """Return the counts as a dictionary to be saved in JSON."""
+        return {'transclusions': self.transclusions, 'used': self.used,
+                'empty': self.empty, 'values': self.values,
+                'unknown': self.unknown}
+
+    def restore(self, state):
+        """Continue counting from a dictionary returned by state()."""
+        self.transclusions = state['transclusions']
+        self.used = state['used']
+        self.empty = state['empty']
+        self.values = state['values']
+        self.unknown = state['unknown']
+
+    def top(self, param, n=5):
+        """Return the n most common values of a parameter with counts."""
+        counters = self.values.get(param, {})
+        return sorted(((value, counter[0]) for (value, counter)
+                       in counters.items()), key=lambda x: -x[1])[:n]
+
+    def summary(self, name):
+        """Return the summary as a list of lines."""
+        lines = ['%s: %d transclusions' % (name, self.transclusions)]
+        for param in sorted(self.used, key=lambda p: -self.used[p]):
+            top = ', '.join('%s (%d)' % (value[:40], count)
+                            for (value, count) in self.top(param))
+            lines.append('  %s: used %d, empty %d; %s'
+                         % (param, self.used[param],
+                            self.empty.get(param, 0), top))
+        for param in sorted(self.unknown):
+            (count, titles) = self.unknown[param]
+            lines.append('  Unknown parameter %s (%d): %s'
+                         % (param, count, ', '.join(
+                             '[[%s]]' % title for title in titles)))
+        return lines
+
+class RowStore(object):
+    """An SQLite database of the harvested parameters."""
+
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS rows (template TEXT, row INTEGER, '
+            'title TEXT, param TEXT, value TEXT)')
+
+    def clear(self, template):
+        """Delete the rows of a previous run of the template."""
+        self.connection.execute('DELETE FROM rows WHERE template = ?',
+                                (template,))
+
+    def truncate(self, template, rows):
+        """Delete the rows of the template written after a checkpoint."""
+        self.connection.execute(
+            'DELETE FROM rows WHERE template = ? AND row > ?',
+            (template, rows))
+
+    def commit(self):
+        self.connection.commit()
+
+    def insert(self, template, row, title, fields):
+        self.connection.executemany(
+            'INSERT INTO rows VALUES (?, ?, ?, ?, ?)',
+            [(template, row, title, param, value)
+             for (param, value) in fields])
+
+    def close(self):
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS rows_param '
+            'ON rows (template, param, value)')
+        self.connection.commit()
+        self.connection.close()
+
+class TemplateTable(object):
+    """The TSV output of one template, with a column for each parameter."""
+
+    def __init__(self, file, name=None, known=None, store=None, state=None):
+        """
+        Constructor.
+
+        Arguments:
+            * file          - File name to write in
+            * name          - The title of the template
+            * known         - The parameter names used in the template
+            * store         - A RowStore to write the rows in as well
+            * state         - The state() of the table in a stopped run to
+                              be continued
+        """
+        self.file = file
+        self.name = name
+        self.parameters = []  # Column order
+        self.columns = {}  # Parameter name => index in self.parameters
+        self.stats = ParameterStats(known)
+        self.store = store
+        self.rows = 0
+        # The rows are collected here, and copied after the header by close().
+        self.datafile = self.file + '.part'
+        if state is None:
+            if store:
+                store.clear(name)
+            self.data = codecs.open(self.datafile, 'w', 'utf-8')
+            return
+        # Rows written after the checkpoint would be written again.
+        with open(self.datafile, 'r+b') as data:
+            data.truncate(state['offset'])
+        self.data = codecs.open(self.datafile, 'a', 'utf-8')
+        self.parameters = state['parameters']
+        self.columns = dict((param, i)
+                            for (i, param) in enumerate(self.parameters))
+        self.rows = state['rows']
+        self.stats.restore(state['stats'])
+        if store:
+            store.truncate(name, self.rows)
+
+    def write(self, title, fielddict):
+        """Write a row for a transclusion of the template."""
+        values = [None] * len(self.parameters)
+        fields = [(param.strip(), value.strip())
+                  for param, value in fielddict.items()]
+        for param, value in fields:
+            if param not in self.columns:
+                self.columns[param] = len(self.parameters)
+                self.parameters.append(param)
+                values.append(None)
+            values[self.columns[param]] = value
+        self.data.write('%s\t%s\n' % (title, '\t'.join([x.replace('\n', '\\n') if x is not None else '' for x in values])))
+        self.stats.add(title, fields)
+        self.rows += 1
+        if self.store:
+            self.store.insert(self.name, self.rows, title, fields)
+
+    def state(self):
+        """Flush the rows and return what is needed to continue later."""
+        self.data.flush()
+        return {'parameters': self.parameters, 'rows': self.rows,
+                'offset': self.data.tell(), 'stats': self.stats.state()}
+
+    def close(self, keep=False):
+        """Write the header and then the rows into the output file.
+
+        If keep is True, the rows are kept to be continued by a resumed run.
+        """
+        self.data.close()
+        with open(self.file, 'wb') as file:
+            file.write(('\t%s\n' % '\t'.join(self.parameters)).encode('utf-8'))
+            with open(self.datafile, 'rb') as data:
+                shutil.copyfileobj(data, file)
+        if not keep:
+            os.remove(self.datafile)
+        pywikibot.output('\n'.join(self.stats.summary(self.name)))
+
 class ParamsBot(SingleSiteBot):
-    """A bot to harvest all parameters of a given template, including unused and misspelled ones."""
+    """A bot to harvest all parameters of given templates, including unused and misspelled ones."""
 
-    def __init__(self, generator, templateTitle, file=None):
+    def __init__(self, generator, templateTitles, file=None, dumpfile=None,
+                 workers=None, sqlitefile=None, checkpoint=None,
+                 resume=False):
         """
         Constructor.
 
         Arguments:
-            * generator     - A generator that yields Page objects.
-            * templateTitle - The template to work on
-            * file          - File name to write in, by default "params_<template title>.tsv"
+            * generator      - A generator that yields Page objects.
+            * templateTitles - The templates to work on (a title or a list)
+            * file           - File name to write in, by default
+                               "params_<template title>.tsv"; with several
+                               templates it must contain %s for the title
+            * dumpfile       - An XML dump to read the pages from instead of
+                               the generator
+            * workers        - Number of processes parsing the pages of the
+                               dump, by default the number of CPUs
+            * sqlitefile     - An SQLite database to write the rows in as well
+            * checkpoint     - File name to save the state of the run in, by
+                               default the first output file name followed
+                               by ".checkpoint"
+            * resume         - Whether to continue the run saved in the
+                               checkpoint
         """
         super(ParamsBot, self).__init__()
-        self.generator = pg.PreloadingGenerator(generator)
-        self.templateTitle = templateTitle.replace(u'_', u' ')
-        self.templateTitles = self.getTemplateSynonyms(self.templateTitle)
-        self.file = file or u'params_%s.tsv' % templateTitle
-        self.parameters = []
+        self.dumpfile = dumpfile
+        self.workers = workers or os.cpu_count()
+        if isinstance(templateTitles, str):
+            templateTitles = [templateTitles]
+        self.store = RowStore(sqlitefile) if sqlitefile else None
+        filenames = []
+        for templateTitle in templateTitles:
+            if file and '%s' in file:
+                filenames.append(file % templateTitle)
+            else:
+                filenames.append(file or u'params_%s.tsv' % templateTitle)
+        self.checkpointfile = checkpoint or filenames[0] + '.checkpoint'
+        self.done = 0  # Number of pages processed
+        self.last = None  # Title of the last page processed
+        self.completed = False
+        self.saved = time.time()
+        state = None
+        if resume:
+            state = self.loadCheckpoint(templateTitles)
+            self.done = state['done']
+            self.last = state['last']
+        self.tables = {}  # Template title => TemplateTable
+        self.templateTitles = {}  # Title or redirect => TemplateTable
+        for (templateTitle, filename) in zip(templateTitles, filenames):
+            templateTitle = templateTitle.replace(u'_', u' ')
+            table = TemplateTable(filename, templateTitle,
+                                  self.getTemplateParameters(templateTitle),
+                                  self.store,
+                                  state and state['tables'][templateTitle])
+            self.tables[templateTitle] = table
+            for title in self.getTemplateSynonyms(templateTitle):
+                self.templateTitles[title] = table
+        # Finds where the templates begin; the rest of the text is not parsed.
+        self.prefilter = titleregex(self.templateTitles)
+        # Pages contain the same templates again and again.
+        self.normalize = functools.lru_cache(maxsize=10000)(self.normalize)
+        if generator is not None:
+            # The pages done are skipped before being preloaded.
+            self.generator = self.finish(pg.PreloadingGenerator(
+                self.skipdone(generator, lambda page: page.title())))
+
+    def loadCheckpoint(self, templateTitles):
+        """Return the state saved by checkpoint()."""
+        if not os.path.exists(self.checkpointfile):
+            pywikibot.error('There is no checkpoint in %s to resume.'
+                            % self.checkpointfile)
+            exit()
+        with open(self.checkpointfile, encoding='utf-8') as f:
+            state = json.load(f)
+        if (sorted(state['tables'])
+                != sorted(t.replace('_', ' ') for t in templateTitles)):
+            pywikibot.error('%s was saved for other templates: %s'
+                            % (self.checkpointfile,
+                               ', '.join(sorted(state['tables']))))
+            exit()
+        pywikibot.output('Resuming after %d pages, at %s'
+                         % (state['done'], state['last']))
+        return state
+
+    def checkpoint(self, force=False):
+        """Save the state of the run, at most once a minute."""
+        if not force and time.time() - self.saved < 60:
+            return
+        if self.store:
+            self.store.commit()
+        state = {'done': self.done, 'last': self.last,
+                 'tables': dict((name, table.state())
+                                for (name, table) in self.tables.items())}
+        with open(self.checkpointfile + '.new', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(self.checkpointfile + '.new', self.checkpointfile)
+        self.saved = time.time()
+
+    def skipdone(self, items, title, reread=None):
+        """Skip the items already processed in the resumed run.
+
+        The items are skipped until the last page processed. If that page
+        is not found (e.g. it has been deleted since), only as many items
+        are skipped as the pages processed. The items after those are kept
+        until then, or if the items are big (e.g. texts from a dump), they
+        are read again from reread() instead.
+        """
+        items = iter(items)
+        if self.last is not None:
+            kept = []
+            for (i, item) in enumerate(items, 1):
+                if title(item) == self.last:
+                    break
+                if i > self.done and reread is None:
+                    kept.append(item)
+            else:
+                pywikibot.warning('%s not found; continuing after the first '
+                                  '%d pages.' % (self.last, self.done))
+                if reread is not None:
+                    kept = itertools.islice(reread(), self.done, None)
+                for item in kept:
+                    yield item
+        for item in items:
+            yield item
+
+    def finish(self, pages):
+        """Yield the pages and note if all of them were yielded."""
+        for page in pages:
+            yield page
+        self.completed = True
 
     def getTemplateSynonyms(self, title):
         """Fetch redirects of the title, so we can check against them."""
@@ -85,48 +507,114 @@ class ParamsBot(SingleSiteBot):
         titles.append(temp.title(withNamespace=False))
         return titles
 
-    def write_file(self, text):
-        with codecs.open(self.file, 'a', 'utf-8') as file:
-            file.write(text)        
+    def getTemplateParameters(self, title):
+        """Return the names of the {{{parameters}}} of the template.
+
+        None is returned if the template has none, e.g. because it calls a
+        module with all its parameters.
+        """
+        temp = pywikibot.Page(pywikibot.Site(), title, ns=10)
+        if temp.isRedirectPage():
+            temp = temp.getRedirectTarget()
+        known = set(re.findall(r'\{\{\{\s*([^{}|]+?)\s*[|}]', temp.text))
+        return known or None
+
+    def normalize(self, template):
+        """Return the title of a template without namespace, or None."""
+        try:
+            return pywikibot.Page(self.site, template,
+                                  ns=10).title(withNamespace=False)
+        except (pywikibot.exceptions.InvalidTitle, LookupError):
+            pywikibot.error(
+                "Failed parsing template; '%s' should be the template name."
+                % template)
+            return None
+
+    def mayhave(self, text):
+        """Return False if none of the templates occur in the text.
+
+        The text is not cleaned here, so templates in comments and the like
+        pass; extract() drops them.
+        """
+        return self.prefilter.search(text) is not None
 
-    def output(self, page, params):
-        pywikibot.output(u'%s: %s' % (page.title(), params))
+    def output(self, title, params):
+        pywikibot.output(u'%s: %s' % (title, params))
 
     def treat(self, page):
         """Process a single page."""
         if willstop:
             raise KeyboardInterrupt
         self.current_page = page
-        
+
         pagetext = page.get()
-        templates = textlib.extract_templates_and_params(pagetext)
+        if self.mayhave(pagetext):
+            self.process(page.title(), extract(pagetext, self.prefilter))
+        self.done += 1
+        self.last = page.title()
+        self.checkpoint()
+
+    def process(self, title, templates):
+        """Write the parameters of the templates found on a page."""
         for (template, fielddict) in templates:
             # Clean up template
-            try:
-                template = pywikibot.Page(self.site, template,
-                                          ns=10).title(withNamespace = False)
-            except (pywikibot.exceptions.InvalidTitle, LookupError):
-                pywikibot.error(
-                    "Failed parsing template; '%s' should be the template name."
-                    % template)
+            template = self.normalize(template)
+            if template is None:
                 continue
-            # We found the template we were looking for
+            # We found a template we were looking for
             if template in self.templateTitles:
-                values = [None] * len(self.parameters)
-                for param, value in fielddict.items():
-                    param = param.strip()
-                    value = value.strip()
-                    if param in self.parameters:
-                        values[self.parameters.index(param)] = value
-                    else:
-                        self.parameters.append(param)
-                        values.append(value)
-                self.output(page, fielddict)
-                # Write in file
-                self.write_file('%s\t%s\n' % (page.title(), '\t'.join([x.replace('\n', '\\n') if x is not None else '' for x in values])))
+                self.output(title, fielddict)
+                # Write in its file
+                self.templateTitles[template].write(title, fielddict)
+
+    def dumppages(self):
+        """Yield (title, text) of the pages of the dump that may be hits."""
+        for entry in xmlreader.XmlDump(self.dumpfile).parse():
+            if willstop:
+                return
+            if not entry.isredirect and self.mayhave(entry.text):
+                yield (entry.title, entry.text)
+
+    def run(self):
+        """Process the pages of the generator or the dump."""
+        if not self.dumpfile:
+            super(ParamsBot, self).run()
+            return
+        pywikibot.output('Reading %s...' % self.dumpfile)
+        pool = multiprocessing.Pool(self.workers, _initworker,
+                                    (self.prefilter,))
+        try:
+            # imap keeps the order of the pages, so the order of the columns
+            # is the same as with one process.
+            pages = self.skipdone(self.dumppages(), lambda item: item[0],
+                                  self.dumppages)
+            for (title, templates) in pool.imap(_extract, pages,
+                                                chunksize=16):
+                # The pool reads ahead, so it is checked here as well.
+                if willstop:
+                    break
+                self.process(title, templates)
+                self.done += 1
+                self.last = title
+                self.checkpoint()
+            else:
+                self.completed = not willstop
+            pool.close()
+        finally:
+            pool.terminate()
+            self.exit()
 
     def exit(self):
-        self.write_file('\t%s\n' % '\t'.join(self.parameters))
+        if not self.completed:
+            self.checkpoint(force=True)
+            pywikibot.output('Stopped after %d pages; use -resume to continue.'
+                             % self.done)
+        for table in self.tables.values():
+            table.close(keep=not self.completed)
+        if self.store:
+            self.store.close()
+        if self.completed and os.path.exists(self.checkpointfile):
+            os.remove(self.checkpointfile)
         super(ParamsBot, self).exit()
 
 def main(*args):
@@ -138,36 +626,69 @@ def main(*args):
     @param args: command line arguments
     @type args: list of unicode
     """
-    template_title = None
+    template_titles = []
     filename = None
+    dumpfile = None
+    workers = None
+    sqlitefile = None
+    checkpoint = None
+    resume = False
     args = pywikibot.handle_args(*args)
     gen = pg.GeneratorFactory()
-    
+
     for arg in args:
-        if arg.startswith('-template'):
+        if arg.startswith('-templatecat'):
+            if len(arg) == 12:
+                cat_title = pywikibot.input(u'Please enter the category of the templates:')
+            else:
+                cat_title = arg[13:]
+            cat = pywikibot.Category(pywikibot.Site(), cat_title)
+            template_titles.extend(page.title(withNamespace=False)
+                                   for page in cat.articles(namespaces=[10]))
+        elif arg.startswith('-template'):
             if len(arg) == 9:
-                template_title = pywikibot.input(u'Please enter the template to work on:')
+                template_titles.append(pywikibot.input(u'Please enter the template to work on:'))
             else:
-                template_title = arg[10:]
+                template_titles.append(arg[10:])
+        elif arg.startswith('-dump:'):
+            dumpfile = arg[6:]
+        elif arg.startswith('-workers:'):
+            workers = int(arg[9:])
+        elif arg.startswith('-sqlite:'):
+            sqlitefile = arg[8:]
+        elif arg.startswith('-checkpoint:'):
+            checkpoint = arg[12:]
+        elif arg == '-resume':
+            resume = True
         elif gen.handleArg(arg):
             if arg.startswith(u'-transcludes:'):
-                template_title = arg[13:]
+                template_titles.append(arg[13:])
         elif arg.startswith('-outputfile'):
             if len(arg) == 11:
                 filename = pywikibot.input(u'Please enter the output file name:')
             else:
                 filename = arg[12:]
 
-    if not template_title:
-        pywikibot.error('Please specify either -template or -transcludes argument')
+    if not template_titles:
+        pywikibot.error('Please specify either -template, -templatecat or -transcludes argument')
+        return
+    if filename and len(template_titles) > 1 and '%s' not in filename:
+        pywikibot.error('With several templates the output file name must contain %s')
         return
 
-    generator = gen.getCombinedGenerator()
-    if not generator:
-        gen.handleArg(u'-transcludes:' + template_title)
+    if dumpfile:
+        generator = None
+    else:
         generator = gen.getCombinedGenerator()
+        if not generator:
+            for template_title in template_titles:
+                gen.handleArg(u'-transcludes:' + template_title)
+            generator = gen.getCombinedGenerator()
+        # A page transcluding several of the templates is fetched only once.
+        generator = pg.DuplicateFilterPageGenerator(generator)
 
-    bot = ParamsBot(generator, template_title, filename)
+    bot = ParamsBot(generator, template_titles, filename, dumpfile, workers,
+                    sqlitefile, checkpoint, resume)
     bot.run()
 
 if __name__ == '__main__':
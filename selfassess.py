@@ -14,25 +14,6 @@ import pywikibot
 from pywikibot import pagegenerators as pg, textlib, bot
 from pywikibot.bot import SingleSiteBot
 
-class AssessmentTemplate(pywikibot.Page):
-    """An assessment template."""
-    multi = False
-    redirs = []
-    
-    def __init__(self, source, title, multi=False):
-        super(AssessmentTemplate, self).__init__(source, title, ns=10)
-        self.multi = multi
-        for redir in self.getReferences(redirectsOnly=True, namespaces=[10], follow_redirects=False):
-            self.redirs.append(redir.title(withNamespace=False))
-    
-    def __eq__(self, other):
-        if isinstance(other, pywikibot.page.BasePage):
-            other = other.title(withNamespace=False)
-        if isinstance(other, str):
-            return (other == self.title(withNamespace=False) or other in self.redirs)
-        else:
-            return NotImplementedError
-
 class SelfAssessmentCollecterBot(SingleSiteBot):
     """A bot collecting assessments of own articles."""
     
@@ -42,31 +23,51 @@ class SelfAssessmentCollecterBot(SingleSiteBot):
     userParam = u'szerkesztő'
     fields_to_write = [u'besorolás', u'szint', u'fontosság', u'szerkesztő', u'dátum']
     
-    templates = []
-    
     def __init__(self, user):
         super(SelfAssessmentCollecterBot, self).__init__()
         self.user = pywikibot.User(self.site, user).title(withNamespace=False)
         pywikibot.output('User: %s' % self.user)
         self.generator = self.gen()
-        self.getTemplates()
-        self.multiAssessmentTemplate = AssessmentTemplate(self.site, self.multiAssessmentTemplate, True)
+        # Template title or redirect => whether it is the multi template
+        self.templates = self.getTemplates()
     
     def gen(self):
-        for page in pg.PreloadingGenerator(pg.UserContributionsGenerator(self.user, namespaces=[0])):
-            if next(page.revisions(reverse=True)).user == self.user:
-                talk = page.toggleTalkPage()
-                if talk.exists():
-                    yield talk
+        """Yield the existing talk pages of the articles, with their text."""
+        # Existence and text come in the same batched requests.
+        for talk in pg.PreloadingGenerator(self.talkpages()):
+            if talk.exists():
+                yield talk
+    
+    def talkpages(self):
+        """Yield the talk pages of the articles created by the user."""
+        contribs = self.site.usercontribs(user=self.user, namespaces=[0])
+        # Only the edits creating a page, so the user is the creator of all.
+        contribs.request['ucshow'] = 'new'
+        titles = set()
+        for contrib in contribs:
+            if contrib['title'] in titles:
+                continue
+            titles.add(contrib['title'])
+            yield pywikibot.Page(self.site, contrib['title']).toggleTalkPage()
         
     def getTemplates(self):
+        """Return the assessment templates and their redirects.
+
+        The result is a dictionary of title => whether it is the multi
+        template, so treat() needs no requests to look them up.
+        """
         category = pywikibot.Category(self.site, self.assessmentTemplateCategory)
         pages = set(pg.CategorizedPageGenerator(category, namespaces=[10]))
-        pages.add(pywikibot.Page(self.site, self.multiAssessmentTemplate, ns=10))
+        multi = pywikibot.Page(self.site, self.multiAssessmentTemplate, ns=10)
+        pages.add(multi)
+        templates = {}
         for member in pages:
-            self.templates.append(member.title(withNamespace=False))
+            titles = [member.title(withNamespace=False)]
             for page in member.getReferences(redirectsOnly=True, namespaces=[10], follow_redirects=False):
-                self.templates.append(page.title(withNamespace=False))
+                titles.append(page.title(withNamespace=False))
+            for title in titles:
+                templates[title] = templates.get(title, False) or member == multi
+        return templates
     
     def isSearchedUser(self, user):
         pywikibot.output('Assessing user: "%s"' % user)
@@ -101,14 +102,14 @@ class SelfAssessmentCollecterBot(SingleSiteBot):
             except (pywikibot.exceptions.InvalidTitle, LookupError):
                 pywikibot.error('Invalid template name: %s' % template)
                 continue
-            if AssessmentTemplate(self.site, template) not in self.templates:
+            if template not in self.templates:
                 continue
             params = {}
             for name, value in fields.items():
                 name = name.strip()
                 value = value.strip()
                 params[name] = value
-            if template == self.multiAssessmentTemplate:
+            if self.templates[template]:
                 for name in params:
                     rem = re.match((r'%s(\d+)' % self.userParam), name)
                     if rem and self.isSearchedUser(params[name]):
@@ -0,0 +1,349 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Tests for anniversary.py.
+
+The article texts are in data/anniversary, one article per file, named as
+in anniversary_bench.py. The wiki is not used: where the bots need it, it
+is replaced by FakeSite and FakePage. Run from the root of the repository
+with
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from xml.sax.saxutils import escape
+
+os.environ.setdefault('PYWIKIBOT_NO_USER_CONFIG', '2')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pywikibot
+from pywikibot import date, pagegenerators, textlib
+
+# Newer pywikibot asks the wiki for the month names, which are only needed
+# at import time here, for the exceptions.
+months = ['január', 'február', 'március', 'április', 'május', 'június',
+          'július', 'augusztus', 'szeptember', 'október', 'november',
+          'december']
+with mock.patch.object(date, 'monthName', lambda lang, i: months[i - 1]):
+    import anniversary
+
+datadir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                       'anniversary')
+
+
+def readdata():
+    """Return the (title, text) tuples of the files in datadir."""
+    articles = []
+    for name in sorted(os.listdir(datadir)):
+        with open(os.path.join(datadir, name), encoding='utf-8') as f:
+            articles.append((os.path.splitext(name)[0].replace('_', ' '),
+                             f.read()))
+    return articles
+
+
+def oldparse3(text):
+    """parse3() as it was before disabledspans(), asking isDisabled()."""
+    lines = text.splitlines(1)
+    comeon = True
+    where = 0
+    linenum = 0
+    tx1 = tx2 = ''
+    while comeon and linenum < len(lines):
+        line = lines[linenum]
+        if anniversary.sectionpattern.match(line) and \
+                not textlib.isDisabled(text, where):
+            tx2 = line
+            comeon = False
+        else:
+            tx1 += line
+        where += len(line)
+        linenum += 1
+    comeon = True
+    while comeon and linenum < len(lines):
+        line = lines[linenum]
+        if anniversary.stopsectionregex.match(line) and \
+                not textlib.isDisabled(text, where):
+            comeon = False
+        else:
+            tx2 += line
+        where += len(line)
+        linenum += 1
+    return (tx1, tx2)
+
+
+class TestParse3(unittest.TestCase):
+    """Compare parse3() with the version using isDisabled()."""
+
+    def parse3(self, text):
+        # parse3() does not use the bot itself.
+        return anniversary.DailyBot.parse3(None, text)
+
+    def test_articles(self):
+        """The raw texts of the articles are split the same."""
+        for (title, text) in readdata():
+            with self.subTest(title=title):
+                self.assertEqual(self.parse3(text), oldparse3(text))
+
+    def test_cleaned_articles(self):
+        """The texts as cleaned by cleanup() are split the same."""
+        for (title, text) in readdata():
+            text = anniversary.references.sub('', text)
+            text = anniversary.HTMLcomments.sub('', text)
+            with self.subTest(title=title):
+                self.assertEqual(self.parse3(text), oldparse3(text))
+
+    def test_disabled_headings(self):
+        """Headings in disabled parts neither start nor stop section B."""
+        texts = dict(readdata())
+        (intro, body) = self.parse3(texts['Liszt Ferenc'])
+        self.assertIn('== Források ==', intro)
+        self.assertTrue(body.startswith('== Élete =='))
+        self.assertIn('== Művei ==', body)
+        self.assertNotIn('* [[Liszt Ferenc Zeneművészeti Egyetem]]', body)
+        (intro, body) = self.parse3(texts['Budapest'])
+        self.assertTrue(body.startswith('== Nevének eredete =='))
+        self.assertIn('Millenniumi Földalatti Vasút', body)
+
+
+class FakeSite(object):
+    """The little of a site the bots need, without asking the wiki."""
+
+    code = lang = 'hu'
+
+
+class FakePage(object):
+    """A page of FakePage.wiki instead of the wiki.
+
+    wiki maps the titles to (text, revid, links) tuples, where links are
+    the titles the page links to as the wiki knows them. Saved pages are
+    put into saved.
+    """
+
+    wiki = {}
+    saved = {}
+
+    def __init__(self, site, title):
+        self.site = site
+        self._title = title[:1].upper() + title[1:]
+
+    def title(self, asLink=False, as_link=False, withNamespace=True):
+        if asLink or as_link:
+            return '[[%s]]' % self._title
+        return self._title
+
+    def namespace(self):
+        return 0
+
+    def exists(self):
+        return self._title in self.wiki
+
+    @property
+    def latest_revision_id(self):
+        return self.wiki[self._title][1]
+
+    def get(self):
+        if not self.exists():
+            raise pywikibot.NoPage(self)
+        return self.wiki[self._title][0]
+
+    def linkedPages(self, namespaces=None, follow_redirects=False):
+        return [FakePage(self.site, title)
+                for title in self.wiki[self._title][2]]
+
+    def put(self, text, summary):
+        self.saved[self._title] = text
+
+
+def formatdate(site):
+    """Return a date formatter like date.FormatDate for huwiki."""
+    return lambda month, day: '%s %d.' % (months[month - 1], day)
+
+
+def wikilinks(text):
+    """Return the titles linked in the text."""
+    return [m.group(1) for m in anniversary.linkregex.finditer(text)]
+
+
+def writedump(filename, articles, timestamp):
+    """Write (title, text) tuples into an XML dump of their revisions."""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" '
+                'version="0.10" xml:lang="hu">\n')
+        for (i, (title, text)) in enumerate(articles, 1):
+            f.write('<page><title>%s</title><ns>0</ns><id>%d</id>'
+                    '<revision><id>%d</id><timestamp>%s</timestamp>'
+                    '<contributor><username>Teszt</username><id>1</id>'
+                    '</contributor><text xml:space="preserve">%s</text>'
+                    '</revision></page>\n'
+                    % (escape(title), i, i, timestamp, escape(text)))
+        f.write('</mediawiki>\n')
+
+
+def hits(data):
+    """Return the (section, title, year) of the results in export() form."""
+    return sorted((sect, title, year)
+                  for (sect, items) in data.items()
+                  for (title, revid, year, text, start, end) in items)
+
+
+class TestMultiDay(unittest.TestCase):
+    """Process the articles offline with DumpScanner and IncrementalUpdater."""
+
+    days = [(4, 1), (7, 31), (10, 6)]
+    year5 = 4
+    dumptime = '2026-09-01T12:00:00Z'
+
+    def setUp(self):
+        site = FakeSite()
+        for patcher in [
+                mock.patch.object(pywikibot, 'Site', lambda: site),
+                mock.patch.object(pywikibot, 'Page', FakePage),
+                mock.patch.object(date, 'FormatDate', formatdate, create=True),
+                mock.patch.object(date, 'monthName',
+                                  lambda lang, i: months[i - 1]),
+                mock.patch.object(pagegenerators, 'PreloadingGenerator',
+                                  lambda generator, groupsize=50: generator),
+                mock.patch.object(FakePage, 'wiki', {}),
+                mock.patch.object(FakePage, 'saved', {})]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.articles = readdata()
+        for (i, (title, text)) in enumerate(self.articles, 1):
+            FakePage.wiki[title] = (text, i, wikilinks(text))
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.dumpfile = os.path.join(self.tmpdir, 'dump.xml')
+        writedump(self.dumpfile, self.articles, self.dumptime)
+        self.store = anniversary.HitStore(
+            os.path.join(self.tmpdir, 'hits.sqlite'))
+        self.addCleanup(self.store.close)
+
+    def scan(self):
+        """Process the days from the dump and return the bots."""
+        session = anniversary.Session()
+        bots = [session.bot(month, day, self.year5, True)
+                for (month, day) in self.days]
+        anniversary.DumpScanner(self.dumpfile, session, bots,
+                                self.store).run()
+        return bots
+
+    def expected(self, month, day):
+        """Return the results of a day processed alone, as DailyBot.crawl().
+
+        The articles linking to the day are those linking to it in their
+        text, as in the dump.
+        """
+        bot = anniversary.Session().bot(month, day, self.year5, True)
+        daytitle = bot.fd(month, day)
+        for (title, (text, revid, links)) in sorted(FakePage.wiki.items()):
+            page = FakePage(bot.site, title)
+            if title.isdigit():
+                bot.yearcache.add(page, bot.cleanup(text))
+            elif daytitle in links:
+                bot.process(page, bot.cleanup(text))
+        bot.yearcache.apply(bot)
+        return hits(bot.export())
+
+    def test_dump(self):
+        """The days of a dump get the results of processing them alone."""
+        bots = self.scan()
+        for bot in bots:
+            with self.subTest(month=bot.month, day=bot.day):
+                self.assertEqual(hits(bot.export()),
+                                 self.expected(bot.month, bot.day))
+                self.assertEqual(
+                    hits(self.store.data(bot.month, bot.day, self.year5)),
+                    hits(bot.export()))
+        results = dict(((bot.month, bot.day), hits(bot.export()))
+                       for bot in bots)
+        # [[1894]]. [[április 1.]] in the article, and an event of 1894
+        self.assertIn(('other', 'Kossuth Lajos', 1894), results[(4, 1)])
+        self.assertIn(('years', '1894', 1894), results[(4, 1)])
+        # 1849 is a year ending with 4 or 9, but one of its lines is
+        # commented out.
+        texts = [item[3] for item in bots[0].export()['years']
+                 if item[0] == '1849']
+        self.assertEqual(len(texts), 2)
+        self.assertFalse(any('forrást kérek' in text for text in texts))
+        # 1848 does not end with 4 or 9.
+        self.assertNotIn('1848', [hit[1] for hit in results[(4, 1)]])
+        self.assertIn(('infobox', 'Petőfi Sándor', 1849), results[(7, 31)])
+        self.assertEqual(sorted(self.store.targets()),
+                         [(month, day, self.year5)
+                          for (month, day) in self.days])
+        # One day earlier than the latest revision in the dump
+        self.assertEqual(self.store.since().isoformat(),
+                         '2026-08-31T12:00:00Z')
+
+    def test_incremental(self):
+        """Only the days of changed pages are rebuilt, without stale hits."""
+        self.scan()
+        before = dict(((month, day), hits(self.store.data(month, day,
+                                                          self.year5)))
+                      for (month, day) in self.days)
+        self.assertIn(('other', 'Kossuth Lajos', 1894), before[(4, 1)])
+        self.assertIn(('infobox', 'Petőfi Sándor', 1849), before[(7, 31)])
+        # Kossuth Lajos loses the date of his funeral.
+        (text, revid, links) = FakePage.wiki['Kossuth Lajos']
+        text = text.replace('Temetése [[1894]]. [[április 1.]]-jén',
+                            'Temetése')
+        self.assertNotIn('április 1.', text)
+        FakePage.wiki['Kossuth Lajos'] = (text, 100, wikilinks(text))
+        # Petőfi Sándor is deleted.
+        del FakePage.wiki['Petőfi Sándor']
+        # Budapest gets a date, and a link to the day from a template only.
+        (text, revid, links) = FakePage.wiki['Budapest']
+        text = text.replace(
+            '== Története ==\n',
+            '== Története ==\nKossuth temetésén, 1894. április 1. napján '
+            'százezrek vonultak az utcákra.\n{{Évfordulók navigáció}}\n')
+        FakePage.wiki['Budapest'] = (text, 101,
+                                     wikilinks(text) + ['Április 1.'])
+        changes = os.path.join(self.tmpdir, 'changes.json')
+        with open(changes, 'w', encoding='utf-8') as f:
+            json.dump([
+                # Before the dump, already in the results
+                {'title': 'Liszt Ferenc', 'timestamp': '2026-08-01T00:00:00Z',
+                 'ns': 0},
+                {'title': 'Kossuth Lajos', 'timestamp': '2026-09-05T10:00:00Z',
+                 'ns': 0},
+                {'title': 'Petőfi Sándor', 'timestamp': '2026-09-06T10:00:00Z',
+                 'ns': 0, 'type': 'log'},
+                {'title': 'Budapest', 'timestamp': '2026-09-07T10:00:00Z',
+                 'ns': 0},
+                {'title': 'Vita:Budapest',
+                 'timestamp': '2026-09-07T11:00:00Z', 'ns': 1},
+            ], f)
+        session = anniversary.Session()
+        updater = anniversary.IncrementalUpdater(session, self.store, changes)
+        self.assertEqual(updater.changedtitles(self.store.since()),
+                         {'Kossuth Lajos', 'Petőfi Sándor', 'Budapest'})
+        updater.run()
+        after = dict(((month, day), hits(self.store.data(month, day,
+                                                         self.year5)))
+                     for (month, day) in self.days)
+        self.assertEqual(sorted(FakePage.saved), [
+            anniversary.basepage + '/’4 és ’9/04-01',
+            anniversary.basepage + '/’4 és ’9/07-31'])
+        self.assertEqual(after[(10, 6)], before[(10, 6)])
+        self.assertNotIn(('other', 'Kossuth Lajos', 1894), after[(4, 1)])
+        self.assertIn(('other', 'Budapest', 1894), after[(4, 1)])
+        self.assertNotIn('Petőfi Sándor', [hit[1] for hit in after[(7, 31)]])
+        # Nothing else changed.
+        self.assertEqual(
+            [hit for hit in before[(4, 1)] if hit[1] != 'Kossuth Lajos'],
+            [hit for hit in after[(4, 1)] if hit[1] != 'Budapest'])
+        self.assertEqual(
+            [hit for hit in before[(7, 31)] if hit[1] != 'Petőfi Sándor'],
+            after[(7, 31)])
+        self.assertGreater(self.store.since().isoformat(), self.dumptime)
+
+
+if __name__ == '__main__':
+    unittest.main()